@@ -0,0 +1,39 @@
+from inspect import isawaitable
+
+from hearsay.event_director import EventDirector
+from hearsay.invertibles import BaseInvertible
+from game_event_labels import GameEventLabel
+
+"""An event director whose listeners may be coroutines. Game events invoked with invoke_game_event_async await each coroutine listener in priority order.
+All of a game's state, including its debug state, lives on its director, so an event loop can interleave many games in one process.
+The events of one game must still be awaited one at a time. invoke_game_event doesn't await, so game events with coroutine listeners must be invoked with
+invoke_game_event_async; synchronous requests (e.g. debug_name and rolodex lookups) work as usual. Profiling and queued mode apply only to invoke_game_event."""
+class AsyncEventDirector(EventDirector):
+    async def invoke_game_event_async(self, event_label:GameEventLabel, *args, target_id:int or list[int] = None):
+        """Invoke a game event, awaiting coroutine listeners. If target_id is given, only unowned subscribers and subscribers owned by the target(s) are invoked."""
+        recording = self.command_log != None and self._recording_depth == 0
+        if recording:
+            record = self.command_log.pickle_event(event_label, args, target_id)
+        done_count = self._stack.done_count
+        if self.debug_mode:
+            self.label_hierarchy.append(event_label)
+        self._recording_depth += 1
+        try:
+            invertibles = []
+            for subscriber in self._game_events[event_label.value]._get_snapshot(target_id):
+                result = subscriber(*args)
+                if isawaitable(result):
+                    result = await result
+                if result != None:
+                    if isinstance(result, BaseInvertible):
+                        invertibles.append(result)
+                    else:
+                        invertibles += result
+            for invertible in invertibles:
+                self._stack.push(invertible)
+        finally:
+            self._recording_depth -= 1
+        if self.debug_mode:
+            self.label_hierarchy.pop()
+        if recording and self._stack.done_count != done_count:
+            self.command_log.append_pickled_event(record)
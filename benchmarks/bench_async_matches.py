@@ -0,0 +1,80 @@
+"""Load test of many concurrent matches per process on AsyncEventDirector. Reports matches per second per core.
+Run from the directory containing the hearsay package: python -m hearsay.benchmarks.bench_async_matches [--matches N] [--concurrency N] [--processes N]
+Each match is a small synthetic game played for a number of turns. Every turn awaits a coroutine listener which yields to the event loop, as one waiting on a
+player or a remote service would, so the matches in a process interleave."""
+import argparse
+import asyncio
+import multiprocessing
+from time import perf_counter
+
+from hearsay.async_event_director import AsyncEventDirector
+from hearsay.benchmarks.fixture import STATES, BenchTag, make_game
+from hearsay.invertibles import Invertible
+from hearsay.rules import Rule
+from game_event_labels import GameEventLabel
+
+async def play_match(turns:int) -> int:
+    """Play one match and return the number of game events invoked."""
+    game = make_game(20, 5, 10, director_type = AsyncEventDirector, debug_mode = False)
+    event_director = game.event_director
+    health = {id: 30 for id in game.generic_ids}
+
+    async def on_damage(id:int, amount:int):
+        await asyncio.sleep(0)
+        old = health[id]
+        return Invertible(lambda: health.__setitem__(id, old - amount), lambda: health.__setitem__(id, old), [id])
+    event_director.subscribe(GameEventLabel.TRY_DAMAGE, 0, on_damage)
+
+    rule = Rule.has_any_of_tags(event_director, BenchTag, BenchTag.RED, BenchTag.LARGE)
+    events = 0
+    for turn in range(turns):
+        id = game.generic_ids[turn % len(game.generic_ids)]
+        await event_director.invoke_game_event_async(GameEventLabel.TRY_DAMAGE, id, 1)
+        await event_director.invoke_game_event_async(GameEventLabel.TRY_CHANGE_STATE, id, STATES[turn % len(STATES)], target_id = id)
+        rule.check_entity(game.tagged_ids[turn % len(game.tagged_ids)])
+        events += 3
+        if turn % 10 == 9:
+            event_director.try_undo()
+    return events
+
+async def play_matches(match_count:int, concurrency:int, turns:int) -> int:
+    semaphore = asyncio.Semaphore(concurrency)
+    async def play():
+        async with semaphore:
+            return await play_match(turns)
+    return sum(await asyncio.gather(*[play() for _ in range(match_count)]))
+
+def _run_process(arguments:tuple) -> tuple[int, float]:
+    match_count, concurrency, turns = arguments
+    start = perf_counter()
+    events = asyncio.run(play_matches(match_count, concurrency, turns))
+    return events, perf_counter() - start
+
+def main(args:list[str] = None):
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--matches', type = int, default = 500, help = 'matches per process')
+    parser.add_argument('--concurrency', type = int, default = 200, help = 'matches in progress at once per process')
+    parser.add_argument('--turns', type = int, default = 50)
+    parser.add_argument('--processes', type = int, default = 1)
+    options = parser.parse_args(args)
+
+    arguments = (options.matches, options.concurrency, options.turns)
+    start = perf_counter()
+    if options.processes == 1:
+        results = [_run_process(arguments)]
+    else:
+        with multiprocessing.Pool(options.processes) as pool:
+            results = pool.map(_run_process, [arguments] * options.processes)
+    wall_seconds = perf_counter() - start
+
+    match_count = options.matches * options.processes
+    events = sum(events for events, _ in results)
+    process_seconds = sum(seconds for _, seconds in results)
+    print(f"{match_count} matches of {options.turns} turns, {options.concurrency} at a time in each of {options.processes} process(es)")
+    print(f"{'Wall time' : <30}{wall_seconds : >14.3f} s")
+    print(f"{'Matches/s' : <30}{match_count / wall_seconds : >14,.1f}")
+    print(f"{'Matches/s per core' : <30}{match_count / process_seconds : >14,.1f}")
+    print(f"{'Game events/s per core' : <30}{events / process_seconds : >14,.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""Benchmarks for composing large numbers of invertibles.
+Run from the directory containing the hearsay package: python -m hearsay.benchmarks.bench_compose"""
+from time import perf_counter
+
+from hearsay.invertibles import Invertible
+
+def _noop():
+    pass
+
+def _report(name:str, count:int, seconds:float):
+    print(f"{name : <30}{count : >10} invertibles{seconds : >10.3f} s")
+
+def bench_compose(count:int):
+    invertibles = [Invertible(_noop, _noop) for _ in range(count)]
+
+    start = perf_counter()
+    composition = Invertible.compose(*invertibles)
+    _report('compose', count, perf_counter() - start)
+
+    start = perf_counter()
+    composition = Invertible.compose(composition, Invertible.compose(*invertibles))
+    _report('compose nested', 2 * count, perf_counter() - start)
+
+    start = perf_counter()
+    composition.do()
+    _report('do', 2 * count, perf_counter() - start)
+
+    start = perf_counter()
+    composition.undo()
+    _report('undo', 2 * count, perf_counter() - start)
+
+if __name__ == '__main__':
+    for count in (10_000, 100_000, 1_000_000):
+        bench_compose(count)
@@ -0,0 +1,29 @@
+"""Micro-benchmark of the per-event overhead of debug and release dispatch.
+Run from the directory containing the hearsay package: python -m hearsay.benchmarks.bench_dispatch_modes"""
+from time import perf_counter
+
+from hearsay.event_director import EventDirector
+from game_event_labels import GameEventLabel
+
+LABEL = next(iter(GameEventLabel))
+
+def _noop(*_):
+    pass
+
+def bench_mode(debug_mode:bool, subscriber_count:int, invocation_count:int = 200_000) -> float:
+    """Return the mean time per targeted event in nanoseconds."""
+    event_director = EventDirector(debug_mode = debug_mode)
+    for i in range(subscriber_count):
+        event_director.subscribe(LABEL, 0, _noop, owner_id = 0)
+    invoke_game_event = event_director.invoke_game_event
+    start = perf_counter()
+    for _ in range(invocation_count):
+        invoke_game_event(LABEL, 0, target_id = 0)
+    return (perf_counter() - start) / invocation_count * 1e9
+
+if __name__ == '__main__':
+    print(f"{'Subscribers' : <15}{'Debug ns/event' : >18}{'Release ns/event' : >18}")
+    for subscriber_count in (0, 1, 10):
+        debug_ns = bench_mode(True, subscriber_count)
+        release_ns = bench_mode(False, subscriber_count)
+        print(f"{subscriber_count : <15}{debug_ns : >18.0f}{release_ns : >18.0f}")
@@ -0,0 +1,32 @@
+"""Measures the cold-start cost of importing hearsay, using the interpreter's -X importtime report.
+Run from the directory containing the hearsay package: python -m hearsay.benchmarks.bench_import_time"""
+import subprocess
+import sys
+
+CORE_MODULES = ['hearsay.event_director', 'hearsay.components', 'hearsay.entities', 'hearsay.rules', 'hearsay.tag_component', 'hearsay.rolodexes', 'hearsay.debug_name_component', 'hearsay.rule_checker']
+HEAVY_MODULES = ['numpy', 'multiprocessing', 'asyncio']
+
+def measure_import_time(statement:str) -> list[tuple[str, int, int, int]]:
+    """Run the statement in a fresh interpreter. Return (module, nesting depth, self us, cumulative us) for every module imported."""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], capture_output = True, text = True, check = True)
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+if __name__ == '__main__':
+    startup_modules = {row[0] for row in measure_import_time('pass')}
+    rows = measure_import_time(f"import {', '.join(CORE_MODULES)}")
+    total_us = sum(row[3] for row in rows if row[1] == 0 and row[0] not in startup_modules)
+    print(f"Import time of the core modules: {total_us / 1000 : .1f} ms")
+    print(f"\n{'Module' : <50}{'Self ms' : >10}{'Cumulative ms' : >15}\n")
+    for name, _, self_us, cumulative_us in sorted(rows, key = lambda row: row[3], reverse = True)[:20]:
+        if name not in startup_modules:
+            print(f"{name : <50}{self_us / 1000 : >10.2f}{cumulative_us / 1000 : >15.2f}")
+    imported = {row[0] for row in rows}
+    loaded_heavy_modules = [module for module in HEAVY_MODULES if module in imported]
+    print(f"\nHeavy modules loaded: {', '.join(loaded_heavy_modules) if loaded_heavy_modules else 'none'}")
@@ -0,0 +1,80 @@
+"""Benchmark of memory per stack entry and undo/redo sweep time for closure invertibles and SetAttribute, and of seeking versus stepping.
+Run from the directory containing the hearsay package: python -m hearsay.benchmarks.bench_invertibles"""
+import tracemalloc
+from time import perf_counter
+
+from hearsay.benchmarks.fixture import STATES, make_game
+from hearsay.invertibles import Invertible, InvertibleStack, SetAttribute
+from game_event_labels import GameEventLabel
+
+class _Target:
+    def __init__(self):
+        self.value = 0
+
+def _closure_invertible(target:_Target, old:int, new:int) -> Invertible:
+    def do():
+        target.value = new
+
+    def undo():
+        target.value = old
+
+    return Invertible(do, undo, [0])
+
+def _attribute_invertible(target:_Target, old:int, new:int) -> Invertible:
+    return SetAttribute(target, 'value', old, new, [0])
+
+def bench(make_invertible:callable, count:int) -> tuple[float, float, float]:
+    """Return the traced bytes per entry, and the seconds taken to push every entry and to undo and redo them all."""
+    target = _Target()
+    stack = InvertibleStack()
+    tracemalloc.start()
+    start_memory, _ = tracemalloc.get_traced_memory()
+    for i in range(count):
+        stack.push(make_invertible(target, i, i + 1))
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    target = _Target()
+    stack = InvertibleStack()
+    start = perf_counter()
+    for i in range(count):
+        stack.push(make_invertible(target, i, i + 1))
+    push_seconds = perf_counter() - start
+    start = perf_counter()
+    while stack.try_undo():
+        pass
+    while stack.try_redo():
+        pass
+    assert target.value == count
+    return (memory - start_memory) / count, push_seconds, perf_counter() - start
+
+def bench_seek(state_changes:int, generic_count:int = 10) -> tuple[float, float]:
+    """Return the seconds taken to rewind a run of state changes on a few generic components by stepping and by seeking."""
+    seconds = []
+    for seeking in (False, True):
+        game = make_game(0, 0, generic_count)
+        event_director = game.event_director
+        event_director.stack.checkpoint('start')
+        for i in range(state_changes):
+            id = game.generic_ids[i % generic_count]
+            event_director.invoke_game_event(GameEventLabel.TRY_CHANGE_STATE, id, STATES[(i // generic_count + id) % len(STATES)], target_id = id)
+        start = perf_counter()
+        if seeking:
+            event_director.seek('start')
+        else:
+            while event_director.try_undo():
+                pass
+        seconds.append(perf_counter() - start)
+    return seconds[0], seconds[1]
+
+if __name__ == '__main__':
+    count = 200_000
+    print(f"{count} entries\n")
+    print(f"{'Invertible' : <20}{'Bytes/entry' : >14}{'Push s' : >10}{'Undo+redo s' : >14}")
+    for name, make_invertible in (('closures', _closure_invertible), ('SetAttribute', _attribute_invertible)):
+        bytes_per_entry, push_seconds, sweep_seconds = bench(make_invertible, count)
+        print(f"{name : <20}{bytes_per_entry : >14.0f}{push_seconds : >10.3f}{sweep_seconds : >14.3f}")
+
+    state_changes = 20_000
+    step_seconds, seek_seconds = bench_seek(state_changes)
+    print(f"\nRewinding {state_changes} state changes: {step_seconds : .3f} s by try_undo, {seek_seconds : .3f} s by seek")
@@ -0,0 +1,54 @@
+"""Benchmark of allocation and time per request-style game event, with and without a request pool and queries, against calling the response directly.
+Run from the directory containing the hearsay package: python -m hearsay.benchmarks.bench_requests"""
+import sys
+from enum import auto
+from time import perf_counter
+
+from hearsay.debug_name_component import DebugNameComponent
+from hearsay.entities import Entity
+from hearsay.event_director import EventDirector
+from hearsay.out_var import OutVar, RequestPool
+from hearsay.rolodexes import EntityRolodex, RolodexComponent
+
+class _Rolodex(EntityRolodex):
+    TARGET = auto()
+
+class _DictOutVar:
+    """An OutVar without __slots__, for comparison."""
+    def __init__(self, default = None):
+        self._result = default
+
+def bench_requests(use_request_pool:bool, use_queries:bool = True, entity_count:int = 100, request_count:int = 100_000) -> tuple[float, float]:
+    """Return the mean time per request in nanoseconds and the number of OutVars allocated per request."""
+    event_director = EventDirector(debug_mode = False, use_request_pool = use_request_pool)
+    if not use_queries:
+        event_director._query_events.clear()
+    components = []
+    for i in range(entity_count):
+        rolodex = RolodexComponent({_Rolodex.TARGET: 0})
+        Entity(event_director, DebugNameComponent(f'entity {i}'), rolodex)
+        components.append(rolodex)
+    start = perf_counter()
+    for i in range(request_count // 2):
+        component = components[i % entity_count]
+        component.debug_name
+        component._try_rolodex_lookup(_Rolodex.TARGET)
+    ns = (perf_counter() - start) / request_count * 1e9
+    allocated = event_director.request_pool.created if use_request_pool else request_count
+    return ns, allocated / request_count
+
+if __name__ == '__main__':
+    slots_size = sys.getsizeof(OutVar())
+    dict_var = _DictOutVar()
+    dict_size = sys.getsizeof(dict_var) + sys.getsizeof(dict_var.__dict__)
+    print(f"Bytes per OutVar: {slots_size} with __slots__, {dict_size} without")
+    print(f"Bytes per RequestPool: {sys.getsizeof(RequestPool())}\n")
+    print(f"{'Mode' : <20}{'ns/request' : >14}{'OutVars/request' : >18}")
+    for name, use_request_pool, use_queries in (('unpooled', False, False), ('pooled', True, False), ('pooled query', True, True)):
+        ns, per_request = bench_requests(use_request_pool, use_queries)
+        print(f"{name : <20}{ns : >14.0f}{per_request : >18.5f}")
+    component = DebugNameComponent('entity')
+    start = perf_counter()
+    for _ in range(100_000):
+        component._on_request_tags(None, OutVar())
+    print(f"{'direct call' : <20}{(perf_counter() - start) / 100_000 * 1e9 : >14.0f}")
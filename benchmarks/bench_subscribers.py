@@ -0,0 +1,82 @@
+"""Benchmarks for game event subscriber bookkeeping.
+Run from the directory containing the hearsay package: python -m hearsay.benchmarks.bench_subscribers"""
+import random
+from time import perf_counter
+
+from hearsay.event_director import EventDirector
+from game_event_labels import GameEventLabel
+
+LABEL = next(iter(GameEventLabel))
+
+def _noop(*_):
+    pass
+
+def _report(name:str, operations:int, seconds:float):
+    print(f"{name : <40}{operations : >10} ops{seconds : >10.3f} s{operations / seconds : >14,.0f} ops/s")
+
+def bench_invoke_heavy(subscriber_count:int = 1000, invocation_count:int = 10000):
+    """Many invocations of one label with a fixed set of subscribers."""
+    event_director = EventDirector()
+    for i in range(subscriber_count):
+        event_director.subscribe(LABEL, random.randint(-5, 5), _noop, owner_id = i)
+
+    start = perf_counter()
+    for _ in range(invocation_count // 100):
+        event_director.invoke_game_event(LABEL)
+    _report('invoke heavy (broadcast)', invocation_count // 100, perf_counter() - start)
+
+    start = perf_counter()
+    for i in range(invocation_count):
+        event_director.invoke_game_event(LABEL, target_id = i % subscriber_count)
+    _report('invoke heavy (targeted)', invocation_count, perf_counter() - start)
+
+def bench_churn_heavy(subscriber_count:int = 1000, churn_count:int = 10000, invocations_per_churn:int = 1):
+    """Frequent subscription changes interleaved with invocations."""
+    event_director = EventDirector()
+    unsubscribes = [event_director.subscribe(LABEL, random.randint(-5, 5), _noop, owner_id = i) for i in range(subscriber_count)]
+
+    start = perf_counter()
+    for i in range(churn_count):
+        owner_id = random.randrange(subscriber_count)
+        unsubscribes[owner_id]()
+        unsubscribes[owner_id] = event_director.subscribe(LABEL, random.randint(-5, 5), _noop, owner_id = owner_id)
+        for _ in range(invocations_per_churn):
+            event_director.invoke_game_event(LABEL, target_id = owner_id)
+    _report('churn heavy', churn_count, perf_counter() - start)
+
+def bench_spawn_heavy(entity_count:int = 10000):
+    """Spawning and destroying token entities, each with a few components."""
+    from hearsay.benchmarks.fixture import BenchGenericComponent, BenchTag
+    from hearsay.debug_name_component import DebugNameComponent
+    from hearsay.entities import Entity, Prototype
+    from hearsay.tag_component import TagComponent
+    event_director = EventDirector()
+
+    start = perf_counter()
+    entities = [Entity(event_director, DebugNameComponent('token'), TagComponent(BenchTag, BenchTag.RED), BenchGenericComponent()) for _ in range(entity_count)]
+    _report('spawn', entity_count, perf_counter() - start)
+
+    start = perf_counter()
+    for entity in entities:
+        entity.destroy()
+    _report('destroy', entity_count, perf_counter() - start)
+
+    prototype = Prototype((DebugNameComponent, 'token'), (TagComponent, BenchTag, BenchTag.RED), (BenchGenericComponent,))
+    start = perf_counter()
+    ids = event_director.spawn_entities(prototype, entity_count)
+    _report('spawn_entities', entity_count, perf_counter() - start)
+
+    start = perf_counter()
+    event_director.destroy_entities(ids)
+    _report('destroy_entities', entity_count, perf_counter() - start)
+
+    start = perf_counter()
+    event_director.try_undo()
+    event_director.try_undo()
+    _report('undo both', 2 * entity_count, perf_counter() - start)
+
+if __name__ == '__main__':
+    random.seed(0)
+    bench_invoke_heavy()
+    bench_churn_heavy()
+    bench_spawn_heavy()
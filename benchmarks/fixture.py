@@ -0,0 +1,74 @@
+"""A synthetic game for benchmarks, with configurable numbers of tagged, rolodex and state-switching entities.
+Entities are made in the order tagged, rolodex, generic, so their ids are the same in every game made with the same counts."""
+from dataclasses import dataclass, field
+from enum import auto
+
+from hearsay.components import GenericComponent, Listener
+from hearsay.debug_name_component import DebugNameComponent
+from hearsay.entities import Entity
+from hearsay.entity_tag import EntityTag
+from hearsay.event_director import EventDirector
+from hearsay.rolodexes import EntityRolodex, RolodexComponent
+from hearsay.tag_component import TagComponent
+from component_states import ComponentState
+from game_event_labels import GameEventLabel
+
+class BenchTag(EntityTag):
+    RED = auto()
+    GREEN = auto()
+    BLUE = auto()
+    LARGE = auto()
+
+class BenchRolodex(EntityRolodex):
+    TARGET = auto()
+
+class BenchState(ComponentState):
+    READY = auto()
+    EXHAUSTED = auto()
+    FROZEN = auto()
+
+STATES = [BenchState.READY, BenchState.EXHAUSTED, BenchState.FROZEN, BenchState.READY | BenchState.FROZEN, BenchState(0)]
+
+"""A generic component whose listeners are subscribed and unsubscribed as its state changes. The listeners do nothing."""
+class BenchGenericComponent(GenericComponent[BenchState]):
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(BenchState)
+
+    @Listener(GameEventLabel.REQUEST_PASSES_RULE, 0, BenchState.READY, targeted = True)
+    def _on_ready(self, *_):
+        pass
+
+    @Listener(GameEventLabel.REQUEST_PASSES_RULE, 0, BenchState.EXHAUSTED, BenchState.FROZEN, targeted = True)
+    def _on_exhausted(self, *_):
+        pass
+
+    @Listener(GameEventLabel.REQUEST_PASSES_RULE, 1, None, BenchState.FROZEN, targeted = True)
+    def _on_not_frozen(self, *_):
+        pass
+
+@dataclass
+class SyntheticGame:
+    event_director: EventDirector
+    tagged_ids: list[int] = field(default_factory = list)
+    rolodex_ids: list[int] = field(default_factory = list)
+    generic_ids: list[int] = field(default_factory = list)
+
+    @property
+    def entity_ids(self) -> list[int]:
+        return self.tagged_ids + self.rolodex_ids + self.generic_ids
+
+def make_game(tagged_count:int = 1000, rolodex_count:int = 100, generic_count:int = 100, director_type:type = EventDirector, **director_options) -> SyntheticGame:
+    """Make a game. director_options are passed on to the director, e.g. use_tag_index = True."""
+    game = SyntheticGame(director_type(**director_options))
+    tags = list(BenchTag)
+    for i in range(tagged_count):
+        tag = tags[i % len(tags)] | (BenchTag.LARGE if i % 3 == 0 else BenchTag(0))
+        game.tagged_ids.append(Entity(game.event_director, DebugNameComponent(f'tagged {i}'), TagComponent(BenchTag, tag)).id)
+    for i in range(rolodex_count):
+        target_id = game.tagged_ids[i % tagged_count] if tagged_count > 0 else None
+        game.rolodex_ids.append(Entity(game.event_director, DebugNameComponent(f'rolodex {i}'), RolodexComponent({BenchRolodex.TARGET: target_id})).id)
+    for i in range(generic_count):
+        game.generic_ids.append(Entity(game.event_director, DebugNameComponent(f'generic {i}'), BenchGenericComponent()).id)
+    return game
@@ -0,0 +1,154 @@
+"""Benchmark suite over a synthetic game. Reports throughput and peak traced memory per scenario, and saves or compares JSON baselines.
+Run from the directory containing the hearsay package:
+    python -m hearsay.benchmarks.suite --save baseline.json
+    python -m hearsay.benchmarks.suite --compare baseline.json
+Each scenario is timed without tracing, then run again on a new game under tracemalloc for its peak memory."""
+import argparse
+import json
+import platform
+import tracemalloc
+from time import perf_counter
+
+from hearsay.benchmarks.fixture import STATES, BenchRolodex, BenchTag, make_game
+from hearsay.components import Component
+from hearsay.invertibles import Invertible
+from hearsay.rolodexes import RolodexComponent
+from hearsay.rules import Rule
+from game_event_labels import GameEventLabel
+
+def _noop():
+    pass
+
+def _component_of(event_director, id:int, component_type:type) -> Component:
+    return next(c for c in event_director.entity_registry.get_components(id) if isinstance(c, component_type))
+
+# Each scenario takes a game and the run options, does its setup, and returns a function which runs the measured work and returns its operation count.
+
+def targeted_requests(game, options):
+    components = [_component_of(game.event_director, id, RolodexComponent) for id in game.rolodex_ids]
+    def run():
+        for i in range(options.requests):
+            component = components[i % len(components)]
+            component.debug_name
+            component._try_rolodex_lookup(BenchRolodex.TARGET)
+        return 2 * options.requests
+    return run
+
+def rule_filtering(game, options):
+    rule = Rule.compose(Rule.has_any_of_tags(game.event_director, BenchTag, BenchTag.RED, BenchTag.BLUE), Rule.lacks_tags(game.event_director, BenchTag, BenchTag.LARGE))
+    ids = game.tagged_ids
+    def run():
+        for _ in range(options.sweeps):
+            rule.filter_entities(ids)
+        return options.sweeps * len(ids)
+    return run
+
+def state_churn(game, options):
+    def run():
+        for i in range(options.state_changes):
+            id = game.generic_ids[i % len(game.generic_ids)]
+            game.event_director.invoke_game_event(GameEventLabel.TRY_CHANGE_STATE, id, STATES[(i // len(game.generic_ids) + id) % len(STATES)], target_id = id)
+        return options.state_changes
+    return run
+
+def undo_redo_sweep(game, options):
+    state_churn(game, options)()
+    def run():
+        count = 0
+        while game.event_director.try_undo():
+            count += 1
+        while game.event_director.try_redo():
+            count += 1
+        return count
+    return run
+
+def compose(game, options):
+    invertibles = [Invertible(_noop, _noop, [i]) for i in range(options.invertibles)]
+    def run():
+        composition = Invertible.compose(*invertibles)
+        composition.do()
+        composition.undo()
+        return len(invertibles)
+    return run
+
+SCENARIOS = {
+    'targeted requests': targeted_requests,
+    'rule filtering': rule_filtering,
+    'state change churn': state_churn,
+    'undo/redo sweep': undo_redo_sweep,
+    'compose invertibles': compose,
+}
+
+def _make_game(options):
+    director_options = {'debug_mode': options.debug, 'use_tag_index': options.tag_index, 'queue_events': options.queue_events, 'use_rolodex_index': options.rolodex_index}
+    return make_game(options.tagged, options.rolodexes, options.generics, **director_options)
+
+def run_scenario(scenario:callable, options) -> dict:
+    run = scenario(_make_game(options), options)
+    start = perf_counter()
+    operations = run()
+    seconds = perf_counter() - start
+
+    game = _make_game(options)
+    tracemalloc.start()
+    run = scenario(game, options)
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'operations': operations, 'seconds': seconds, 'ops_per_s': operations / seconds, 'peak_kib': (peak - baseline) / 1024}
+
+def _report(name:str, result:dict, baseline:dict = None):
+    line = f"{name : <25}{result['operations'] : >10}{result['ops_per_s'] : >16,.0f}{result['peak_kib'] : >14,.1f}"
+    if baseline != None and name in baseline['results']:
+        old = baseline['results'][name]
+        line += f"{result['ops_per_s'] / old['ops_per_s'] : >12.2f}x{result['peak_kib'] / max(old['peak_kib'], 1e-9) : >12.2f}x"
+    print(line)
+
+def _parse_args(args:list[str] = None):
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--tagged', type = int, default = 1000, help = 'entities with a tag component')
+    parser.add_argument('--rolodexes', type = int, default = 100, help = 'entities with a rolodex component')
+    parser.add_argument('--generics', type = int, default = 100, help = 'entities with a state-switching generic component')
+    parser.add_argument('--requests', type = int, default = 20_000)
+    parser.add_argument('--sweeps', type = int, default = 20, help = 'rule filters over every entity')
+    parser.add_argument('--state-changes', type = int, default = 20_000)
+    parser.add_argument('--invertibles', type = int, default = 200_000)
+    parser.add_argument('--debug', action = argparse.BooleanOptionalAction, default = True, help = 'debug or release dispatch')
+    parser.add_argument('--tag-index', action = 'store_true')
+    parser.add_argument('--rolodex-index', action = 'store_true')
+    parser.add_argument('--queue-events', action = 'store_true', help = 'queued rather than re-entrant dispatch')
+    parser.add_argument('--only', action = 'append', choices = list(SCENARIOS.keys()), help = 'run only these scenarios')
+    parser.add_argument('--save', metavar = 'PATH', help = 'save the results as a JSON baseline')
+    parser.add_argument('--compare', metavar = 'PATH', help = 'compare against a saved baseline')
+    return parser.parse_args(args)
+
+def main(args:list[str] = None) -> dict:
+    options = _parse_args(args)
+    baseline = None
+    if options.compare != None:
+        with open(options.compare) as file:
+            baseline = json.load(file)
+    header = f"{'Scenario' : <25}{'Ops' : >10}{'Ops/s' : >16}{'Peak KiB' : >14}"
+    if baseline != None:
+        header += f"{'Ops/s vs base' : >14}{'Peak vs base' : >13}"
+    print(header)
+    results = {}
+    for name, scenario in SCENARIOS.items():
+        if options.only != None and name not in options.only:
+            continue
+        results[name] = run_scenario(scenario, options)
+        _report(name, results[name], baseline)
+    report = {
+        'python': platform.python_version(),
+        'options': {key: value for key, value in vars(options).items() if key not in ('save', 'compare', 'only')},
+        'results': results,
+    }
+    if options.save != None:
+        with open(options.save, 'w') as file:
+            json.dump(report, file, indent = 2)
+    return report
+
+if __name__ == '__main__':
+    main()
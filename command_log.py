@@ -0,0 +1,204 @@
+import pickle
+import struct
+
+from hearsay.exceptions import InvertibleError
+
+"""A compact, append-only binary log of the commands which changed a game: top-level game events (label, arguments and target), undos, redos, the bounds of
+transactions, spawns and destructions of entities, and named markers.
+Record with EventDirector.record_commands. Entity ids are stable, so a log replays onto any game set up the same way as the one recorded.
+Each record is a little-endian header of payload length and kind, followed by a pickled payload. A truncated final record (e.g. after a crash) is ignored when reading, and cut off when the log is reopened for appending."""
+
+_MAGIC = b'HSCL\x01'
+_HEADER = struct.Struct('<IB')
+
+EVENT = 0
+UNDO = 1
+REDO = 2
+MARKER = 3
+BEGIN_TRANSACTION = 4
+END_TRANSACTION = 5
+SPAWN = 6
+DESTROY = 7
+_BOUNDS = (BEGIN_TRANSACTION, END_TRANSACTION)     # Not counted as commands
+
+class CommandLog:
+    def __init__(self, path:str, flush_every:int = 1):
+        self.path = path
+        self._flush_every = flush_every
+        self._unflushed = 0
+        self._file = open(path, 'ab')
+        end = _find_end(path)
+        if end != self._file.tell():
+            self._file.truncate(end)            # Drop a record torn by a crash, so that new records follow the last complete one
+            self._file.seek(end)
+        if end == 0:
+            self._file.write(_MAGIC)
+            self._file.flush()
+
+    def __enter__(self) -> 'CommandLog':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def append_event(self, event_label, args:tuple, target_id:int or list[int]):
+        self.append_pickled_event(self.pickle_event(event_label, args, target_id))
+
+    def pickle_event(self, event_label, args:tuple, target_id:int or list[int]) -> bytes:
+        """Return the payload of an event record, to be appended with append_pickled_event.
+        Lets the event be pickled before it is invoked, so that the record holds its arguments as they were before listeners could change them."""
+        return pickle.dumps((event_label, args, target_id), pickle.HIGHEST_PROTOCOL)
+
+    def append_pickled_event(self, data:bytes):
+        self._write(EVENT, data)
+
+    def append_undo(self):
+        self._append(UNDO, None)
+
+    def append_redo(self):
+        self._append(REDO, None)
+
+    def append_begin_transaction(self):
+        self._append(BEGIN_TRANSACTION, None)
+
+    def append_end_transaction(self):
+        self._append(END_TRANSACTION, None)
+
+    def append_spawn(self, prototype, count:int):
+        self._append(SPAWN, (prototype, count))
+
+    def append_destroy(self, ids:list[int]):
+        self._append(DESTROY, ids)
+
+    def append_marker(self, name:str):
+        """Name the current point in the log, e.g. the start of a turn, so that replays can seek to it."""
+        self._append(MARKER, name)
+
+    def flush(self):
+        self._file.flush()
+        self._unflushed = 0
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def _append(self, kind:int, payload):
+        self._write(kind, pickle.dumps(payload, pickle.HIGHEST_PROTOCOL))
+
+    def _write(self, kind:int, data:bytes):
+        self._file.write(_HEADER.pack(len(data), kind))
+        self._file.write(data)
+        self._unflushed += 1
+        if self._unflushed >= self._flush_every:
+            self.flush()
+
+def read_commands(path:str, offset:int = None):
+    """Yield (kind, payload, offset of the next record) for each record in the log, starting at offset if given."""
+    with open(path, 'rb') as file:
+        if file.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"{path} is not a command log.")
+        if offset != None:
+            file.seek(offset)
+        while True:
+            header = file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            length, kind = _HEADER.unpack(header)
+            data = file.read(length)
+            if len(data) < length:
+                return
+            yield kind, pickle.loads(data), file.tell()
+
+def _find_end(path:str) -> int:
+    """Return the offset just past the last complete record in the log, or 0 if the log is empty or holds only a torn header."""
+    with open(path, 'rb') as file:
+        magic = file.read(len(_MAGIC))
+        if magic != _MAGIC:
+            if _MAGIC.startswith(magic):
+                return 0
+            raise ValueError(f"{path} is not a command log.")
+        end = file.tell()
+        while True:
+            header = file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return end
+            length, _ = _HEADER.unpack(header)
+            if len(file.read(length)) < length:
+                return end
+            end = file.tell()
+
+"""Rebuilds the state of a recorded game at any point in its command log.
+make_game must return a new event director set up exactly as the recorded one was when recording began.
+While streaming forward, a fork of the game is kept every snapshot_interval commands, so that seeking only replays the commands since the nearest snapshot."""
+class Replay:
+    def __init__(self, path:str, make_game:callable, snapshot_interval:int = 1000):
+        self.path = path
+        self._make_game = make_game
+        self._snapshot_interval = snapshot_interval
+        self._snapshots = []                    # (command index, log offset, forked game), in order of command index
+        self._markers = None
+
+    @property
+    def markers(self) -> dict[str, int]:
+        """The command index of each marker in the log."""
+        if self._markers == None:
+            self._markers = {}
+            index = 0
+            for kind, payload, _ in read_commands(self.path):
+                if kind == MARKER:
+                    self._markers[payload] = index
+                elif kind not in _BOUNDS:
+                    index += 1
+        return self._markers
+
+    def seek(self, position:int or str = None):
+        """Return a new event director in the state after the first position commands, or at the named marker. By default, replay the whole log."""
+        if type(position) == str:
+            position = self.markers[position]
+        snapshots = [snapshot for snapshot in self._snapshots if position == None or snapshot[0] <= position]
+        for start, offset, snapshot in reversed(snapshots):
+            event_director = snapshot.fork()
+            try:
+                self._play(event_director, start, offset, position)
+                return event_director
+            except InvertibleError:
+                continue                        # An undo reached back past the snapshot; retry from an earlier one
+        event_director = self._make_game()
+        self._play(event_director, 0, None, position)
+        return event_director
+
+    def _play(self, event_director, index:int, offset:int, position:int):
+        try:
+            self._play_commands(event_director, index, offset, position)
+        finally:
+            while event_director.stack.in_transaction:      # Stopped within a transaction; make what it has done so far an entry
+                event_director.stack.end_transaction()
+
+    def _play_commands(self, event_director, index:int, offset:int, position:int):
+        for kind, payload, next_offset in read_commands(self.path, offset):
+            if position != None and index >= position:
+                return
+            if kind == MARKER:
+                continue
+            if kind == BEGIN_TRANSACTION:
+                event_director.stack.begin_transaction()
+                continue
+            if kind == END_TRANSACTION:
+                event_director.stack.end_transaction()
+                continue
+            if kind == EVENT:
+                event_label, args, target_id = payload
+                event_director.invoke_game_event(event_label, *args, target_id = target_id)
+            elif kind == SPAWN:
+                event_director.spawn_entities(*payload)
+            elif kind == DESTROY:
+                event_director.destroy_entities(payload)
+            elif kind == UNDO and not event_director.try_undo():
+                raise InvertibleError(f"Command {index} undoes past the start of the replay.")
+            elif kind == REDO and not event_director.try_redo():
+                raise InvertibleError(f"Command {index} redoes past the end of the replay.")
+            index += 1
+            # Forks start with no open transaction, so none are taken within one
+            if index % self._snapshot_interval == 0 and not event_director.stack.in_transaction and all(s[0] != index for s in self._snapshots):
+                self._snapshots.append((index, next_offset, event_director.fork()))
+                self._snapshots.sort(key = lambda s: s[0])
@@ -1,14 +1,15 @@
 from abc import ABC
+from dataclasses import dataclass
 
-from hearsay.debug import push_response, debug_label, label_hierarchy
+import hearsay.debug as debug
+from hearsay.debug import push_response, debug_label
 from hearsay.event_director import EventDirector
-from hearsay.invertibles import Invertible
+from hearsay.invertibles import SetAttribute
 from hearsay.class_property import ReadonlyClassProperty
 
 from game_event_labels import GameEventLabel
 from typing import TypeVar, Generic
 from component_states import ComponentState
-from hearsay.out_var import OutVar
 
 """An object which defines a particular behavior for a GameObject. 
 Child classes override listener tags and implement a function called 'on_{event_label}' for each tag. Listeners are then made via reflection in this constructor.
@@ -18,16 +19,15 @@ When making a call to event_director, you do not include the leading self or the
 
 Object state is only read in 'REQUEST_...' game events, and state is only written through invertibles in 'TRY_...' game events."""
 class Component(ABC):
+    __slots__ = ('_id', '_event_director')
+
     #TODO:This is pretty awkward...
     _listeners_by_class = {}
+    _listener_tables_by_class = {}
 
     @property
     def debug_name(self):
-        name_request = OutVar[str]()
-        self._event_director.invoke_game_event(GameEventLabel.REQUEST_DEBUG_NAME, self.id, name_request)
-        if name_request.has_been_set:
-            return name_request.result
-        return 'Untitled'
+        return self._event_director.request(GameEventLabel.REQUEST_DEBUG_NAME, self.id, default = 'Untitled')
 
     @property
     def id(self):
@@ -53,20 +53,28 @@ class Component(ABC):
     def __init__(self):
         self._id = None
 
+    """Return the class's listeners resolved into a frozen table, indexed as in _listeners. Resolved once per class, on first use."""
+    @classmethod
+    def _get_listener_table(cls) -> tuple['_TableListener']:
+        if cls not in Component._listener_tables_by_class:
+            Component._listener_tables_by_class[cls] = tuple(_TableListener.resolve(listener) for listener in cls._listeners)
+        return Component._listener_tables_by_class[cls]
+
     def attach(self, event_director:EventDirector, id:int):
         self._id = id
         self._event_director = event_director
-        self._unsubscribes = _UnsubscribeWrapper()
         self._subscribe()
+        if event_director.rule_cache != None:
+            event_director.rule_cache.invalidate([id])
 
     def detach(self):
+        if self._event_director.rule_cache != None:
+            self._event_director.rule_cache.invalidate([self._id])
         self._id = None
-        for unsubscribe in self._unsubscribes:
-            unsubscribe()
+        self._event_director.unsubscribe_component(self)
 
     def _subscribe(self):
-        for listener in self._listeners:
-            self._unsubscribes.append(listener.event_label, listener.subscribe(self, self._event_director))
+        self._event_director.subscribe_component(self, self._get_listener_table())
 
     """Return True if the id(s) passed permit the game object this component is attached to."""
     def _includes_attached_id(self, id:int or list[int]) -> bool:
@@ -77,36 +85,58 @@ class Component(ABC):
     def _try_rolodex_lookup(self, rolodex_entry, rolodex_holder_id = None):
         if rolodex_holder_id == None:
             rolodex_holder_id = self._id
-        result = OutVar[int]()
-        self._event_director.invoke_game_event(GameEventLabel.REQUEST_ROLODEX_LOOKUP, rolodex_holder_id, rolodex_entry, result)
-        return result.result
+        if self._event_director.rolodex_index != None:
+            return self._event_director.rolodex_index.lookup(rolodex_holder_id, rolodex_entry)
+        return self._event_director.request(GameEventLabel.REQUEST_ROLODEX_LOOKUP, rolodex_holder_id, rolodex_entry)
 
-"""An object instantiated as a decorator which subscribes the decorated function to the event director."""
+    def _try_rolodex_path(self, *rolodex_entries, rolodex_holder_id = None):
+        """Follow the rolodex entries in turn, e.g. _try_rolodex_path(OWNER, HERO, WEAPON) for "my owner's hero's weapon"."""
+        if rolodex_holder_id == None:
+            rolodex_holder_id = self._id
+        if self._event_director.rolodex_index != None:
+            return self._event_director.rolodex_index.resolve(rolodex_holder_id, *rolodex_entries)
+        for rolodex_entry in rolodex_entries:
+            rolodex_holder_id = self._try_rolodex_lookup(rolodex_entry, rolodex_holder_id)
+        return rolodex_holder_id
+
+"""An object instantiated as a decorator which subscribes the decorated function to the event director.
+A targeted listener only responds on behalf of its own entity, so it is skipped by game events targeting other entities.
+A listener may also declare a batch response with '@<listener>.batch', which answers EventDirector.invoke_game_event_batch in one call."""
 class Listener:
-    def __init__(self, label:GameEventLabel, priority:int = 0, inclusive_restrictions = None, exclusive_restrictions = None):
+    def __init__(self, label:GameEventLabel, priority:int = 0, inclusive_restrictions = None, exclusive_restrictions = None, targeted:bool = False):
         self.event_label = label
         self.priority = priority
         self.inclusive_restrictions = inclusive_restrictions
         self.exclusive_restrictions = exclusive_restrictions
+        self.targeted = targeted
+        self.batch_response_name = None
 
     def __set_name__(self, owner:Component, name:str):
+        self.owner = owner
         owner.append_listener(self)
         setattr(owner, name, self.response)
-        push_response(self.event_label, owner, self.priority, name)
+        if debug.enabled:
+            push_response(self.event_label, owner, self.priority, name)
 
     def __call__(self, response:callable):
         self.response_name = response.__name__
         self.response = response
         return self
 
-    def subscribe(self, subscriber:Component, event_director:EventDirector):
-        # TODO: This is a problem with listener inheritance that needs to be addressed!
-        return event_director.subscribe(self.event_label, self.priority, getattr(subscriber, self.response_name))
+    def batch(self, batch_response:callable) -> callable:
+        """Decorate the batch response to this listener. It takes a list of ids in place of the leading id and a dict of results by id in place of the trailing result."""
+        self.batch_response_name = batch_response.__name__
+        return batch_response
 
 FT = TypeVar('FT', bound = ComponentState)
+"""A component whose listeners are subscribed according to its state.
+Instances are slotted; subclasses which declare __slots__ (e.g. __slots__ = ()) stay free of a per-instance __dict__, which matters when there are many of them."""
 class GenericComponent(Component, ABC, Generic[FT]):
+    __slots__ = ('_local_component_state', '_state_store', '_state_type')
+
     #TODO:This is pretty awkward...
     _state_restrictions_by_class = {}
+    _matching_listeners_by_class_and_state = {}
 
     # This mess ensures that listeners are inherited properly.
     @ReadonlyClassProperty
@@ -122,16 +152,39 @@ class GenericComponent(Component, ABC, Generic[FT]):
         return cls._state_restrictions_by_class[cls]
 
     def __init__(self, state_type):
-        self._component_state = None
+        self._local_component_state = None
+        self._state_store = None
         self._state_type = state_type
         super().__init__()
 
+    # Component state lives in the event director's state store while attached to a director which has one.
+    @property
+    def _component_state(self) -> FT:
+        if self._state_store != None:
+            return self._state_store.get(type(self), self._state_type, self._id)
+        return self._local_component_state
+
+    @_component_state.setter
+    def _component_state(self, state:FT):
+        if self._state_store != None:
+            self._state_store.set(type(self), self._state_type, self._id, state)
+        else:
+            self._local_component_state = state
+
     # TODO: change state to the game object's state
     def attach(self, event_director:EventDirector, id:int):
+        if event_director.state_store != None:
+            event_director.state_store.set(type(self), self._state_type, id, self._local_component_state)
+            self._local_component_state = None
+            self._state_store = event_director.state_store
         super().attach(event_director, id)
 
+    # A detached component keeps its state, so that re-attaching it (e.g. undoing EventDirector.destroy_entities) restores it.
     def detach(self):
-        self._component_state = None
+        if self._state_store != None:
+            self._local_component_state = self._component_state
+            self._state_store.remove(type(self), self._state_type, self._id)
+            self._state_store = None
         super().detach()
 
     @classmethod
@@ -140,33 +193,41 @@ class GenericComponent(Component, ABC, Generic[FT]):
         super().append_listener(listener) 
 
     def _subscribe(self):
-        #self._unsubscribes.append(GameEventLabel.TRY_CHANGE_STATE, self._event_director.subscribe(GameEventLabel.TRY_CHANGE_STATE, 0, self._change_state))
-        for listener in [self._listeners[i] for i in GenericComponent._get_matching_flags(self._component_state, self._state_restrictions)]:
-            self._unsubscribes.append(listener.event_label, listener.subscribe(self, self._event_director))
+        self._event_director.subscribe_component(self, self._get_listener_table(), sorted(self._get_matching_listeners(self._component_state)))
+
+    def _update_subscriptions(self):
+        """Subscribe and unsubscribe only the listeners whose eligibility differs between the current state and the subscribed listeners."""
+        matching = self._get_matching_listeners(self._component_state)
+        subscribed = self._event_director.get_subscribed_listeners(self)
+        self._event_director.unsubscribe_component(self, subscribed - matching)
+        self._event_director.subscribe_component(self, self._get_listener_table(), sorted(matching - subscribed))
 
-    @Listener(GameEventLabel.TRY_CHANGE_STATE)
+    """Return the indices of the listeners which are eligible in the state. Computed once per class and state."""
+    @classmethod
+    def _get_matching_listeners(cls, state:FT) -> frozenset[int]:
+        key = (cls, state)
+        if key not in cls._matching_listeners_by_class_and_state:
+            cls._matching_listeners_by_class_and_state[key] = frozenset(GenericComponent._get_matching_flags(state, cls._state_restrictions))
+        return cls._matching_listeners_by_class_and_state[key]
+
+    @Listener(GameEventLabel.TRY_CHANGE_STATE, targeted = True)
     def _change_state(self, id:int, state:ComponentState):
         if (type(state) != self._state_type) or not self._includes_attached_id(id):
             return
         return self._get_change_state_invertible(state)
 
-    def _get_change_state_invertible(self, state) -> Invertible:
-        old_state = self._component_state
-
-        def sub():
-            for unsubscribe in self._unsubscribes:
-                unsubscribe()
-            self._subscribe()
-
-        def do():
-            self._component_state = state
-            sub()
+    def _get_change_state_invertible(self, state) -> SetAttribute:
+        return SetAttribute(self, '_state', self._component_state, state, (self._id,))
 
-        def undo():
-            self._component_state = old_state
-            sub()
+    # Setting _state changes the component state and updates subscriptions to match, so that a state change is a single SetAttribute.
+    @property
+    def _state(self) -> FT:
+        return self._component_state
 
-        return Invertible(do, undo)
+    @_state.setter
+    def _state(self, state:FT):
+        self._component_state = state
+        self._update_subscriptions()
 
     """Return the indices of the restrictions which match the candidate as a list."""
     @staticmethod
@@ -185,19 +246,18 @@ class GenericComponent(Component, ABC, Generic[FT]):
             matching_indices.append(i)
         return matching_indices
 
-# Protect unsubscribe closures and enforce that they are removed from self._unsubscribes when called.
-class _UnsubscribeWrapper():
-    def __init__(self):
-        self._unsubscribes = []
-
-    def __iter__(self):
-        def call_and_remove(label:GameEventLabel, closure:callable):
-            closure()
-            self._unsubscribes.remove((label, closure))
-        result = iter([(lambda f = f: call_and_remove(*f)) for f in self._unsubscribes])
-        return result
+"""A listener as resolved into its component class's listener table. Holds what subscribing needs, and the class which declared the listener for naming it."""
+@dataclass(frozen = True)
+class _TableListener:
+    label_value: int
+    priority: int
+    response_name: str
+    batch_response_name: str
+    targeted: bool
+    owner: type
 
-    def append(self, label:GameEventLabel, closure:callable):
-        self._unsubscribes.append((label, closure))
+    @staticmethod
+    def resolve(listener:Listener) -> '_TableListener':
+        return _TableListener(listener.event_label.value, listener.priority, listener.response_name, listener.batch_response_name, listener.targeted, listener.owner)
 
-__all__ = ['Component', 'GenericComponent', 'Listener', 'debug_label', 'label_hierarchy']
+__all__ = ['Component', 'GenericComponent', 'Listener', 'debug_label']
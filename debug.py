@@ -1,10 +1,14 @@
+import os
 from dataclasses import dataclass
 from typing import Type
 
 from game_event_labels import GameEventLabel
 
 # To log all event responsed subscribed to a given label, type "debug_label(GameEventLabel.<LABEL_NAME>)" at a breakpoint.
-# To view the current label hierarcy, type "label_hierarchy".
+# To view the current label hierarcy, type "self._event_director.label_hierarchy" (each event director keeps its own).
+# Set the environment variable HEARSAY_RELEASE=1 before importing hearsay to skip this bookkeeping. Event directors then default to release mode.
+
+enabled = os.environ.get('HEARSAY_RELEASE', '0').lower() in ('', '0', 'false')
 
 @dataclass
 class _DebugString:
@@ -28,6 +32,4 @@ def debug_label(label:GameEventLabel) -> str:
     for s in _event_responses_by_label[label]:
         result += str(s) + '\n'
     print(result)
-    return result
-
-label_hierarchy:list[GameEventLabel] = []
\ No newline at end of file
+    return result
\ No newline at end of file
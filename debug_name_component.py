@@ -7,8 +7,14 @@ class DebugNameComponent(Component):
         self._name = name
         super().__init__()
 
-    @Listener(GameEventLabel.REQUEST_DEBUG_NAME)
+    @Listener(GameEventLabel.REQUEST_DEBUG_NAME, targeted = True)
     def _on_request_tags(self, candidate_id:int, name_request:OutVar[str]):
         if not self._includes_attached_id(candidate_id):
             return
-        name_request.result = self._name
\ No newline at end of file
+        name_request.result = self._name
+
+    @_on_request_tags.batch
+    def _on_request_debug_name_batch(self, candidate_ids:list[int], name_requests_by_id:dict[int, OutVar[str]]):
+        if not self._includes_attached_id(candidate_ids):
+            return
+        name_requests_by_id[self._id].result = self._name
@@ -0,0 +1,15 @@
+import numpy as np
+
+"""Helpers for arrays indexed directly by entity id, which grow by doubling as ids are allocated. Used by TagIndex and ComponentStateStore."""
+
+def grown_capacity(capacity:int, minimum_capacity:int) -> int:
+    """Return the capacity doubled until it is at least minimum_capacity."""
+    while capacity < minimum_capacity:
+        capacity *= 2
+    return capacity
+
+def resized(array, capacity:int, fill_value = 0):
+    """Return a copy of the array at the new capacity, with any new elements set to fill_value."""
+    result = np.full(capacity, fill_value, dtype = array.dtype)
+    result[:len(array)] = array
+    return result
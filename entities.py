@@ -1,13 +1,12 @@
 from hearsay.components import Component
-from custom_components.minion_components import *
-from custom_components.card_components import *
         
 """An object composed of components which grant it behavior."""
 class Entity:
     # The constructor should not be called directly (usually). Use Entity.Builder instead.
     def __init__(self, event_director, *components:Component):
-        self.id = id(self)
+        self._event_director = event_director
         self._components = []
+        self.id = event_director.entity_registry.register(self)
         self.attach_components(event_director, *components)
 
     # TODO: set newly attached components state to current state
@@ -16,10 +15,26 @@ class Entity:
         for component in components:
             component.attach(event_director, self.id)
 
-    # Note: not invertible!
-    def destroy(self):
+    # Note: not invertible! Use EventDirector.destroy_entities for that. hold_id keeps the id from reuse, for history which may restore the entity.
+    def destroy(self, hold_id:bool = False):
         for component in self._components:
             component.detach()
+        self._event_director.entity_registry.release(self.id, hold_id)
+
+    def _restore(self):
+        """Undo destroy: reclaim the entity's id and re-attach its components."""
+        self._event_director.entity_registry.reclaim(self.id, self)
+        for component in self._components:
+            component.attach(self._event_director, self.id)
+
+"""The components of an entity, as the class and constructor arguments of each, e.g. Prototype((TagComponent, MyTag, MyTag.TOKEN), (DebugNameComponent, 'token')).
+Used by EventDirector.spawn_entities to make many entities alike."""
+class Prototype:
+    def __init__(self, *component_specs:tuple):
+        self.component_specs = component_specs
+
+    def make_components(self) -> list[Component]:
+        return [spec[0](*spec[1:]) for spec in self.component_specs]
 
 # -*- coding: utf-8 -*-
 """
@@ -0,0 +1,81 @@
+from hearsay.exceptions import InvertibleError
+
+"""Allocates entity ids and maps them to their entities.
+Ids are dense integers starting at 0, so they can index arrays and are the same in every process which creates the same entities in the same order.
+Released ids are reused, except for held ids: those released by an entry in the history, which may still give them back to their entities by reclaiming them.
+A held id is freed for reuse only once no entry can reclaim it (see EventDirector), so until then new entities get fresh ids."""
+class EntityRegistry:
+    def __init__(self):
+        self._entities = []                     # Id -> entity, or None if the id is free
+        self._free_ids = []                     # May contain ids which have since been reclaimed; those are skipped when allocating
+        self._free_id_set = set()
+        self._held_ids = set()                  # Released, but not reused until freed
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, id:int) -> bool:
+        return 0 <= id < len(self._entities) and self._entities[id] != None
+
+    def __iter__(self):
+        return (id for id, entity in enumerate(self._entities) if entity != None)
+
+    @property
+    def capacity(self) -> int:
+        """One more than the largest id ever allocated."""
+        return len(self._entities)
+
+    def get(self, id:int):
+        if id not in self:
+            raise KeyError(id)
+        return self._entities[id]
+
+    def get_components(self, id:int) -> list:
+        return self.get(id)._components
+
+    def register(self, entity) -> int:
+        """Allocate an id for the entity and return it."""
+        id = self._allocate_id()
+        self._entities[id] = entity
+        self._count += 1
+        return id
+
+    def release(self, id:int, hold:bool = False):
+        """Release the id of a destroyed entity. The id is free for reuse, unless hold is set, in which case it is kept for reclaim until freed."""
+        self.get(id)
+        self._entities[id] = None
+        if hold:
+            self._held_ids.add(id)
+        else:
+            self._free_ids.append(id)
+            self._free_id_set.add(id)
+        self._count -= 1
+
+    def free(self, ids:list[int] = None):
+        """Free held ids for reuse, or every held id if ids is None. Ids which aren't held are ignored."""
+        for id in list(self._held_ids) if ids == None else ids:
+            if id in self._held_ids:
+                self._held_ids.remove(id)
+                self._free_ids.append(id)
+                self._free_id_set.add(id)
+
+    def reclaim(self, id:int, entity):
+        """Give a released id back to its entity."""
+        if id in self._held_ids:
+            self._held_ids.remove(id)
+        elif id in self._free_id_set:
+            self._free_id_set.remove(id)
+        else:
+            raise InvertibleError(f"Entity id {id} was reused before its release was undone.")
+        self._entities[id] = entity
+        self._count += 1
+
+    def _allocate_id(self) -> int:
+        while len(self._free_ids) > 0:
+            id = self._free_ids.pop()
+            if id in self._free_id_set:
+                self._free_id_set.remove(id)
+                return id
+        self._entities.append(None)
+        return len(self._entities) - 1
@@ -1,34 +1,412 @@
 from __future__ import annotations
 
-from numpy import iterable
-from hearsay.invertibles import Invertible, InvertibleStack
+import copy
+import heapq
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from hearsay.entity_registry import EntityRegistry
+from hearsay.invertibles import BaseInvertible, HistoryPolicy, Invertible, InvertibleStack, SeekStats
+from hearsay.out_var import UNSET, OutVar, RequestPool
+from hearsay.rule_cache import RuleCache
 import hearsay.debug as debug
 from game_event_labels import GameEventLabel
 
+if TYPE_CHECKING:
+    from hearsay.command_log import CommandLog
+    from hearsay.entities import Prototype
+    from hearsay.profiling import EventProfiler
+
 
 
-"""The event loop."""
+"""The event loop.
+In debug mode (the default unless HEARSAY_RELEASE is set), the labels of the game events being invoked are tracked in self.label_hierarchy. In release mode, dispatch skips that bookkeeping.
+By default, a game event invoked by a listener runs immediately, within the invocation of its parent. In queued mode (queue_events = True), it is added to
+self.event_queue instead, and the queue is drained breadth-first once the top-level game event returns. Everything done by a top-level game event is then one
+entry on the stack."""
 class EventDirector:
-    def __init__(self):
-        self._stack = InvertibleStack()
+    def __init__(self, history_policy:HistoryPolicy = None, use_tag_index:bool = False, use_rule_cache:bool = False, profile:bool = False, debug_mode:bool = None, use_state_store:bool = False, use_request_pool:bool = False, queue_events:bool = False, use_rolodex_index:bool = False):
+        self._stack = InvertibleStack(history_policy)
+        self.entity_registry = EntityRegistry()
+        self.tag_index = None
+        if use_tag_index:
+            from hearsay.tag_index import TagIndex             # Imported lazily, since it depends on NumPy
+            self.tag_index = TagIndex()
+        self.state_store = None
+        if use_state_store:
+            from hearsay.state_store import ComponentStateStore     # Imported lazily, since it depends on NumPy
+            self.state_store = ComponentStateStore()
+        self.rolodex_index = None
+        if use_rolodex_index:
+            from hearsay.rolodex_index import RolodexIndex
+            self.rolodex_index = RolodexIndex()
+        self.request_pool = RequestPool() if use_request_pool else None
+        self.event_queue = None
+        if queue_events:
+            from hearsay.event_queue import EventQueue
+            self.event_queue = EventQueue()
+        self.rule_cache = None
+        if use_rule_cache:
+            self.rule_cache = RuleCache()
+            self._stack.add_observer(self.rule_cache.on_stack_change)
         self._game_events = {}
+        self._subscriptions_by_component = {}       # Component -> {listener index: (game event, subscription key, owner id)}
+        self._bound_listeners_by_component = {}     # Component -> [(closure, priority, owner id, batch response) or None by listener index], while subscribed
+        self._pending_subscriptions = None          # [(component, listener table, indices)] deferred by _bulk_subscriptions
+        self._query_events = {}                     # Label -> game event, for labels declared as queries
+        self._held_ids_by_entry = {}                # Spawn or destroy invertible -> the entity ids it released, which are held until it leaves the history
+        self._stack.add_discard_observer(self._on_entry_discarded)
         for label in GameEventLabel:
             self._game_events[label.value] = _GameEvent(label)
-    
-    def subscribe(self, event_label, priority:int, response:callable):
-        """Subscribe to a game event. Return an unsubscribe function. Components are responsible for subscribing to and unsubscribing from events."""
-        return self._game_events[event_label.value].subscribe(response, priority)
-
-    def invoke_game_event(self, event_label:GameEventLabel, *args):
-        """Invoke a game event."""
-        debug.label_hierarchy.append(event_label)
+        for label in (GameEventLabel.REQUEST_DEBUG_NAME, GameEventLabel.REQUEST_ROLODEX_LOOKUP):
+            self.declare_query(label)
+        self.debug_mode = debug.enabled if debug_mode == None else debug_mode
+        self.label_hierarchy = []                   # Per director, so that games in one process don't share debug state
+        self.profiler = None
+        self._profiling = False
+        self.command_log = None
+        self._recording_depth = 0
+        if profile:
+            self.enable_profiling()
+        else:
+            self._bind_dispatch()
+
+    @property
+    def stack(self) -> InvertibleStack:
+        return self._stack
+
+    def fork(self) -> EventDirector:
+        """Return an independent copy of the game, including its entities, components, subscriptions and indexes. Entity ids are unchanged.
+        The copy starts with an empty history, since invertibles can't be copied, so ids held for the original's history are free in the copy.
+        Subscribers which aren't bound methods (e.g. lambdas) are shared with the original. The copy doesn't record commands."""
+        fork = copy.deepcopy(self, {id(self.command_log): None, id(self._held_ids_by_entry): {}})
+        fork.entity_registry.free()
+        fork.stop_recording()
+        return fork
+
+    def try_undo(self) -> bool:
+        """Undo the last entry on the stack. Return whether or not there was anything to undo."""
+        if not self._stack.try_undo():
+            return False
+        if self.command_log != None:
+            self.command_log.append_undo()
+        return True
+
+    def try_redo(self) -> bool:
+        """Redo the last undone entry on the stack. Return whether or not there was anything to redo."""
+        if not self._stack.try_redo():
+            return False
+        if self.command_log != None:
+            self.command_log.append_redo()
+        return True
+
+    def seek(self, position:int or str) -> SeekStats:
+        """Undo or redo to the stack position or named checkpoint in one step (see InvertibleStack.seek). Recorded as the equivalent undos or redos."""
+        start_position = self._stack.position
+        stats = self._stack.seek(position)
+        if self.command_log != None:
+            append = self.command_log.append_undo if self._stack.position < start_position else self.command_log.append_redo
+            for _ in range(stats.entries):
+                append()
+        return stats
+
+    def record_commands(self, command_log:CommandLog):
+        """Append every top-level game event which changes the game to the command log, along with undos, redos, transactions, spawns and destructions made through the director.
+        An event's arguments are pickled before it is invoked, so the log holds them as they were passed, and an event whose arguments can't be pickled raises
+        without changing the game."""
+        self.command_log = command_log
+        self._bind_dispatch()
+
+    def stop_recording(self):
+        self.command_log = None
+        self._bind_dispatch()
+
+    def spawn_entities(self, prototype:Prototype, count:int = 1) -> list[int]:
+        """Make count entities from the prototype as a single entry on the stack, and return their ids.
+        The components of every entity are subscribed together, with one pass per label. Undoing the entry destroys the entities, and redoing it restores
+        the same entities, with the same ids and components; their ids aren't reused while the entry can still be redone.
+        Recorded in the command log, if there is one, so the prototype must be picklable."""
+        from hearsay.entities import Entity
+        if self.command_log != None and self._recording_depth == 0:
+            self.command_log.append_spawn(prototype, count)
+        entities = [Entity(self) for _ in range(count)]
+        components = [prototype.make_components() for _ in range(count)]
+        ids = [entity.id for entity in entities]
+        attached = False
+
+        def do():
+            nonlocal attached
+            with self._bulk_subscriptions():
+                if attached:                            # A redo, which reclaims the ids, or raises if they have been reused
+                    for entity in entities:
+                        entity._restore()
+                    del self._held_ids_by_entry[entry]
+                    return
+                for entity, entity_components in zip(entities, components):
+                    entity.attach_components(self, *entity_components)
+                attached = True
+
+        def undo():
+            for entity in reversed(entities):
+                entity.destroy(hold_id = True)
+            self._held_ids_by_entry[entry] = ids
+
+        entry = Invertible(do, undo, ids)
+        self._stack.push(entry)
+        return ids
+
+    def destroy_entities(self, ids:list[int]):
+        """Destroy the entities as a single entry on the stack. Undoing the entry restores them, with the same ids and components; their ids aren't reused
+        while the entry can still be undone. Recorded in the command log, if there is one."""
+        ids = list(ids)
+        if self.command_log != None and self._recording_depth == 0:
+            self.command_log.append_destroy(ids)
+        entities = [self.entity_registry.get(id) for id in ids]
+
+        def do():
+            for entity in entities:
+                entity.destroy(hold_id = True)
+            self._held_ids_by_entry[entry] = ids
+
+        def undo():
+            with self._bulk_subscriptions():
+                for entity in reversed(entities):
+                    entity._restore()
+            del self._held_ids_by_entry[entry]
+
+        entry = Invertible(do, undo, ids)
+        self._stack.push(entry)
+
+    def _on_entry_discarded(self, invertible):
+        """Free the ids held by a spawn or destroy which can no longer be undone or redone."""
+        ids = self._held_ids_by_entry.pop(invertible, None)
+        if ids != None:
+            self.entity_registry.free(ids)
+
+    def subscribe(self, event_label, priority:int, response:callable, owner_id:int = None, batch_response:callable = None):
+        """Subscribe to a game event. Return an unsubscribe function. Components are responsible for subscribing to and unsubscribing from events.
+        If owner_id is given, the response is only invoked by broadcasts and by game events targeting that entity.
+        If batch_response is given, it answers batched invocations in one call; otherwise response is called once per id."""
+        return self._game_events[event_label.value].subscribe(response, priority, owner_id, batch_response)
+
+    def subscribe_component(self, component, listener_table:tuple, indices = None):
+        """Subscribe the component's responses to the listeners of its class's listener table (see Component._get_listener_table), or only to those at the indices.
+        Each response is bound once while the component is subscribed, and the component's subscriptions to each game event are added in one pass.
+        Subscriptions are kept by component and listener index, so that they can be removed in bulk with unsubscribe_component."""
+        if self._pending_subscriptions != None:
+            self._pending_subscriptions.append((component, listener_table, indices))
+        else:
+            self._add_subscriptions([(component, listener_table, indices)])
+
+    @contextmanager
+    def _bulk_subscriptions(self):
+        """Defer the component subscriptions made within the block, then add them all with one pass per label.
+        Components subscribed within the block mustn't be unsubscribed, or invoked, until it ends."""
+        if self._pending_subscriptions != None:
+            yield
+            return
+        self._pending_subscriptions = []
+        try:
+            yield
+        finally:
+            pending = self._pending_subscriptions
+            self._pending_subscriptions = None
+            self._add_subscriptions(pending)
+
+    def _add_subscriptions(self, requests:list[tuple]):
+        subscriptions_by_label = {}                 # Label value -> [(component's subscriptions, listener index, bound listener)]
+        subscriptions_by_component = self._subscriptions_by_component
+        bound_listeners_by_component = self._bound_listeners_by_component
+        for component, listener_table, indices in requests:
+            subscriptions = subscriptions_by_component.get(component)
+            if subscriptions == None:
+                subscriptions = subscriptions_by_component[component] = {}
+                bound_listeners = bound_listeners_by_component[component] = [None] * len(listener_table)
+            else:
+                bound_listeners = bound_listeners_by_component[component]
+            for label_value, label_indices in _group_by_label(listener_table, indices):
+                group = subscriptions_by_label.get(label_value)
+                if group == None:
+                    group = subscriptions_by_label[label_value] = []
+                for i in label_indices:
+                    bound_listener = bound_listeners[i]
+                    if bound_listener == None:
+                        bound_listener = bound_listeners[i] = _bind_listener(component, listener_table[i])
+                    group.append((subscriptions, i, bound_listener))
+        for label_value, group in subscriptions_by_label.items():
+            game_event = self._game_events[label_value]
+            if len(group) == 1:
+                subscriptions, i, bound_listener = group[0]
+                subscriptions[i] = (game_event, game_event.add(*bound_listener), bound_listener[2])
+                continue
+            keys = game_event.add_many([bound_listener for _, _, bound_listener in group])
+            for (subscriptions, i, bound_listener), key in zip(group, keys):
+                subscriptions[i] = (game_event, key, bound_listener[2])
+
+    def unsubscribe_component(self, component, indices = None):
+        """Unsubscribe the component from the listeners at the indices, or from all of its listeners."""
+        if indices == None:
+            subscriptions = self._subscriptions_by_component.pop(component, {}).values()
+            self._bound_listeners_by_component.pop(component, None)
+        else:
+            subscriptions = [self._subscriptions_by_component[component].pop(i) for i in indices]
+        for game_event, key, owner_id in subscriptions:
+            game_event._unsubscribe(key, owner_id)
+
+    def get_subscribed_listeners(self, component) -> set[int]:
+        """Return the indices of the listeners the component is subscribed to."""
+        return self._subscriptions_by_component.get(component, {}).keys()
+
+    def invoke_game_event(self, event_label:GameEventLabel, *args, target_id:int or list[int] = None):
+        """Invoke a game event. If target_id is given, only unowned subscribers and subscribers owned by the target(s) are invoked."""
+        self.label_hierarchy.append(event_label)
+        try:
+            invertibles = self._game_events[event_label.value].invoke(*args, target_id = target_id)
+        except Exception:
+            raise
+        for invertible in invertibles:
+            self._stack.push(invertible)
+        self.label_hierarchy.pop()
+
+    @contextmanager
+    def transaction(self):
+        """Make every invertible pushed within the block a single entry on the stack. The transaction is recorded, so that replays make the same entry."""
+        self._stack.begin_transaction()
+        if self.command_log != None:
+            self.command_log.append_begin_transaction()
+        try:
+            yield
+        finally:
+            self._stack.end_transaction()
+            if self.command_log != None:
+                self.command_log.append_end_transaction()
+
+    def request(self, event_label:GameEventLabel, target_id:int, *args, default = UNSET):
+        """Invoke a request-style game event on the target, as invoke_game_event(event_label, target_id, *args, out_var, target_id = target_id), and return the OutVar's result.
+        If no subscriber set it, return default, or raise RequestError if there is none. The OutVar comes from the request pool, if the director has one."""
+        pool = self.request_pool
+        out_var = OutVar() if pool == None else pool.acquire()
+        try:
+            query_event = self._query_events.get(event_label)
+            if query_event != None and not self._profiling:
+                if self.debug_mode:
+                    self.label_hierarchy.append(event_label)
+                query_event.query((target_id, *args, out_var), target_id, out_var)
+                if self.debug_mode:
+                    self.label_hierarchy.pop()
+            else:
+                self.invoke_game_event(event_label, target_id, *args, out_var, target_id = target_id)
+            result = out_var._result
+            if result is UNSET:
+                return out_var.result if default is UNSET else default
+            return result
+        finally:
+            if pool != None:
+                pool.release(out_var)
+
+    def declare_query(self, event_label:GameEventLabel):
+        """Make requests of the label queries. A query calls only the target's subscribers, starting from the one which has the final say in a request
+        (the last invoked, e.g. a proxy at a lower priority) and stopping at the first which sets the OutVar. Whatever the subscribers return is ignored.
+        Only declare labels whose subscribers answer independently of each other. REQUEST_DEBUG_NAME and REQUEST_ROLODEX_LOOKUP are queries by default.
+        Queries aren't profiled; while profiling, they are invoked as usual."""
+        self._query_events[event_label] = self._game_events[event_label.value]
+
+    def enable_profiling(self):
+        """Time every game event and listener in self.profiler. Dispatch is swapped for a profiled copy, so there is no cost while profiling is off."""
+        if self.profiler == None:
+            from hearsay.profiling import EventProfiler
+            self.profiler = EventProfiler()
+        self._profiling = True
+        self._bind_dispatch()
+
+    def disable_profiling(self):
+        """Stop profiling. Results are kept in self.profiler."""
+        self._profiling = False
+        self._bind_dispatch()
+
+    def _bind_dispatch(self):
+        """Shadow the dispatch methods with the copies for the director's mode. Debug mode uses the methods themselves."""
+        for name in ('invoke_game_event', 'invoke_game_event_batch', '_unqueued_invoke_game_event', '_unrecorded_invoke_game_event'):
+            self.__dict__.pop(name, None)
+        if not self.debug_mode:
+            self.invoke_game_event = self._invoke_game_event_release
+            self.invoke_game_event_batch = self._invoke_game_event_batch_release
+        if self._profiling:
+            self.invoke_game_event = self._invoke_game_event_profiled
+        if self.event_queue != None:
+            self._unqueued_invoke_game_event = self.invoke_game_event
+            self.invoke_game_event = self._invoke_game_event_queued
+        if self.command_log != None:
+            self._unrecorded_invoke_game_event = self.invoke_game_event
+            self.invoke_game_event = self._invoke_game_event_recorded
+
+    def _invoke_game_event_recorded(self, event_label:GameEventLabel, *args, target_id:int or list[int] = None):
+        if self._recording_depth > 0:
+            return self._unrecorded_invoke_game_event(event_label, *args, target_id = target_id)
+        record = self.command_log.pickle_event(event_label, args, target_id)     # Before invoking, so listeners can't change the arguments recorded
+        done_count = self._stack.done_count
+        self._recording_depth += 1
+        try:
+            self._unrecorded_invoke_game_event(event_label, *args, target_id = target_id)
+        finally:
+            self._recording_depth -= 1
+        if self._stack.done_count != done_count:
+            self.command_log.append_pickled_event(record)
+
+    def _invoke_game_event_queued(self, event_label:GameEventLabel, *args, target_id:int or list[int] = None):
+        queue = self.event_queue
+        if event_label in queue.immediate_labels:
+            return self._unqueued_invoke_game_event(event_label, *args, target_id = target_id)
+        queue.push(event_label, args, target_id)
+        if queue.draining:
+            return
+        queue.draining = True
+        self._stack.begin_transaction()
+        try:
+            while len(queue) > 0:
+                event_label, args, target_id = queue.pop()
+                self._unqueued_invoke_game_event(event_label, *args, target_id = target_id)
+        finally:
+            queue.clear()
+            queue.draining = False
+            self._stack.end_transaction()
+
+    def _invoke_game_event_release(self, event_label:GameEventLabel, *args, target_id:int or list[int] = None):
+        for invertible in self._game_events[event_label.value].invoke_release(args, target_id):
+            self._stack.push(invertible)
+
+    def _invoke_game_event_batch_release(self, event_label:GameEventLabel, ids:list[int], *args, result_factory:callable = OutVar) -> dict:
+        results_by_id = {id: result_factory() for id in ids}
+        for invertible in self._game_events[event_label.value].invoke_batch(list(results_by_id.keys()), args, results_by_id):
+            self._stack.push(invertible)
+        return results_by_id
+
+    def _invoke_game_event_profiled(self, event_label:GameEventLabel, *args, target_id:int or list[int] = None):
+        self.label_hierarchy.append(event_label)
+        self.profiler.begin_event(event_label)
+        try:
+            invertibles, subscribers_run, subscribers_responded = self._game_events[event_label.value].invoke_profiled(self.profiler, *args, target_id = target_id)
+            for invertible in invertibles:
+                self._stack.push(invertible)
+        except Exception:
+            self.profiler.end_event(0, 0, 0)
+            raise
+        self.profiler.end_event(subscribers_run, subscribers_responded, len(invertibles))
+        self.label_hierarchy.pop()
+
+    def invoke_game_event_batch(self, event_label:GameEventLabel, ids:list[int], *args, result_factory:callable = OutVar) -> dict:
+        """Invoke a targeted game event for each of the ids in a single pass over the subscribers. Return the trailing result argument of each invocation, keyed by id.
+        Subscribers without a batch response are called as if by invoke_game_event(event_label, id, *args, result, target_id = id)."""
+        self.label_hierarchy.append(event_label)
+        results_by_id = {id: result_factory() for id in ids}
         try:
-            invertibles = self._game_events[event_label.value].invoke(*args)
+            invertibles = self._game_events[event_label.value].invoke_batch(list(results_by_id.keys()), args, results_by_id)
         except Exception:
             raise
         for invertible in invertibles:
             self._stack.push(invertible)
-        debug.label_hierarchy.pop()
+        self.label_hierarchy.pop()
+        return results_by_id
 
     #def push_to_stack(self, invertible: Invertible):
     #    self._stack.push(invertible)
@@ -36,37 +414,278 @@ class EventDirector:
 class _GameEvent:
     def __init__(self, label:GameEventLabel):
         self._event_label = label
-        self._subscribers = []
-        self._priorities = {}
-
-    def subscribe(self, closure:callable, priority:int = 0):
-        pass
-        self._priorities[closure] = priority
-        self._subscribers.append(closure)
-        def unsub():
-            self._unsubscribe(closure)
-        return unsub
-
-    def _unsubscribe(self, closure:callable):
-        self._subscribers.remove(closure)
-        del self._priorities[closure]
-
-    def _sort_subscribers(self):
-        self._subscribers.sort(reverse = True, key = lambda s : self._priorities[s])
-
-    #TODO: Only sort when necessary
-    def invoke(self, *args) -> list[Invertible]:
+        self._subscribers = _SubscriberList()
+        self._global_subscribers = _SubscriberList()        # Subscribers with no owning entity; invoked by every invocation
+        self._subscribers_by_owner = {}                     # Owning entity id -> subscribers owned by that entity
+        self._targeted_snapshots = {}                       # Owning entity id -> merged snapshot of its subscribers and the global subscribers
+        self._owners = {}
+        self._batch_responses = {}
+        self._next_subscription = 0
+
+    def subscribe(self, closure:callable, priority:int = 0, owner_id:int = None, batch_response:callable = None):
+        return _Unsubscribe(self, self.add(closure, priority, owner_id, batch_response), owner_id)
+
+    def add(self, closure:callable, priority:int = 0, owner_id:int = None, batch_response:callable = None) -> tuple:
+        """Subscribe the closure and return its key."""
+        key = (-priority, self._next_subscription)          # Breaks priority ties in favor of the earliest subscriber
+        self._next_subscription += 1
+        self._subscribers.add(key, closure)
+        self._owners[key] = owner_id
+        if batch_response != None:
+            self._batch_responses[key] = batch_response
+        if owner_id == None:
+            self._global_subscribers.add(key, closure)
+            self._targeted_snapshots.clear()
+        else:
+            if owner_id not in self._subscribers_by_owner:
+                self._subscribers_by_owner[owner_id] = _SubscriberList()
+            self._subscribers_by_owner[owner_id].add(key, closure)
+            self._targeted_snapshots.pop(owner_id, None)
+        return key
+
+    def add_many(self, subscriptions:list[tuple]) -> list[tuple]:
+        """Subscribe each (closure, priority, owner id, batch response) and return their keys.
+        Each subscriber list is extended, and each snapshot invalidated, once per call rather than once per subscription."""
+        keys = []
+        pairs = []
+        global_pairs = []
+        pairs_by_owner = {}
+        owners = self._owners
+        next_subscription = self._next_subscription
+        for closure, priority, owner_id, batch_response in subscriptions:
+            key = (-priority, next_subscription)
+            next_subscription += 1
+            keys.append(key)
+            pairs.append((key, closure))
+            owners[key] = owner_id
+            if batch_response != None:
+                self._batch_responses[key] = batch_response
+            if owner_id == None:
+                global_pairs.append((key, closure))
+            elif owner_id in pairs_by_owner:
+                pairs_by_owner[owner_id].append((key, closure))
+            else:
+                pairs_by_owner[owner_id] = [(key, closure)]
+        self._next_subscription = next_subscription
+        self._subscribers.extend(pairs)
+        if len(global_pairs) > 0:
+            self._global_subscribers.extend(global_pairs)
+            self._targeted_snapshots.clear()
+        subscribers_by_owner = self._subscribers_by_owner
+        for owner_id, owned_pairs in pairs_by_owner.items():
+            owned = subscribers_by_owner.get(owner_id)
+            if owned == None:
+                subscribers_by_owner[owner_id] = _SubscriberList(owned_pairs)
+            else:
+                owned.extend(owned_pairs)
+        if len(self._targeted_snapshots) > 0:
+            for owner_id in pairs_by_owner.keys():
+                self._targeted_snapshots.pop(owner_id, None)
+        return keys
+
+    def _unsubscribe(self, key:tuple, owner_id:int = None):
+        self._subscribers.remove(key)
+        del self._owners[key]
+        self._batch_responses.pop(key, None)
+        if owner_id == None:
+            self._global_subscribers.remove(key)
+            self._targeted_snapshots.clear()
+        else:
+            owned = self._subscribers_by_owner[owner_id]
+            owned.remove(key)
+            if len(owned) == 0:
+                del self._subscribers_by_owner[owner_id]
+            self._targeted_snapshots.pop(owner_id, None)
+
+    def _get_targeted_subscribers(self, target_id:int or list[int]) -> tuple[callable]:
+        if type(target_id) == list:
+            owned = [self._subscribers_by_owner[id] for id in set(target_id) if id in self._subscribers_by_owner]
+            return _SubscriberList.merge(self._global_subscribers, *owned)
+        if target_id in self._targeted_snapshots:
+            return self._targeted_snapshots[target_id]
+        if target_id in self._subscribers_by_owner:
+            subs = _SubscriberList.merge(self._global_subscribers, self._subscribers_by_owner[target_id])
+        else:
+            subs = self._global_subscribers.snapshot()
+        self._targeted_snapshots[target_id] = subs
+        return subs
+
+    def _get_snapshot(self, target_id:int or list[int]) -> tuple[callable]:
+        # Snapshots are immutable, so state changes within subscribers can't change the list during invocation
+        if target_id == None:
+            return self._subscribers.snapshot()
+        return self._get_targeted_subscribers(target_id)
+
+    def invoke(self, *args, target_id:int or list[int] = None) -> list[BaseInvertible]:
         invertibles = []
-        self._sort_subscribers()
-        subs = self._subscribers.copy()             # This prevents state changes within subscribers from changing the list during invocation
-        for subscriber in subs:
+        for subscriber in self._get_snapshot(target_id):
             try:
                 result = subscriber(*args)
                 if result != None:
-                    if iterable(result):
-                        invertibles += result
-                    else:
+                    if isinstance(result, BaseInvertible):
                         invertibles.append(result)
+                    else:
+                        invertibles += result
             except:
                 raise
         return invertibles
+
+    def query(self, args:tuple, target_id:int, out_var:OutVar):
+        """Call the target's subscribers from last to first until one sets the OutVar."""
+        subs = self._targeted_snapshots.get(target_id)
+        if subs == None:
+            subs = self._get_snapshot(target_id)
+        for subscriber in reversed(subs):
+            subscriber(*args)
+            if out_var._result is not UNSET:
+                return
+
+    def invoke_release(self, args:tuple, target_id:int or list[int]) -> list[BaseInvertible]:
+        invertibles = []
+        for subscriber in self._get_snapshot(target_id):
+            result = subscriber(*args)
+            if result != None:
+                if isinstance(result, BaseInvertible):
+                    invertibles.append(result)
+                else:
+                    invertibles += result
+        return invertibles
+
+    def invoke_profiled(self, profiler:EventProfiler, *args, target_id:int or list[int] = None) -> tuple[list[BaseInvertible], int, int]:
+        """Invoke, timing each subscriber. Return the invertibles, the number of subscribers run and the number of those which returned something."""
+        invertibles = []
+        subs = self._get_snapshot(target_id)
+        responded = 0
+        for subscriber in subs:
+            profiler.begin_listener(self._event_label, subscriber)
+            try:
+                result = subscriber(*args)
+            except Exception:
+                profiler.end_listener(False, 0)
+                raise
+            invertible_count = len(invertibles)
+            if result != None:
+                responded += 1
+                if isinstance(result, BaseInvertible):
+                    invertibles.append(result)
+                else:
+                    invertibles += result
+            profiler.end_listener(result != None, len(invertibles) - invertible_count)
+        return invertibles, len(subs), responded
+
+    def invoke_batch(self, ids:list[int], args:tuple, results_by_id:dict) -> list[BaseInvertible]:
+        invertibles = []
+        owned = [self._subscribers_by_owner[id] for id in ids if id in self._subscribers_by_owner]
+        for key, subscriber in _SubscriberList.merge_keyed(self._global_subscribers, *owned):
+            owner_id = self._owners[key]
+            subscriber_ids = ids if owner_id == None else [owner_id]
+            if key in self._batch_responses:
+                results = [self._batch_responses[key](subscriber_ids, *args, results_by_id)]
+            else:
+                results = [subscriber(id, *args, results_by_id[id]) for id in subscriber_ids]
+            for result in results:
+                if result != None:
+                    if isinstance(result, BaseInvertible):
+                        invertibles.append(result)
+                    else:
+                        invertibles += result
+        return invertibles
+
+def _bind_listener(component, listener) -> tuple:
+    """Return the (closure, priority, owner id, batch response) with which the component subscribes to the listener table entry."""
+    owner_id = component._id if listener.targeted else None
+    batch_response = getattr(component, listener.batch_response_name) if listener.batch_response_name != None else None
+    return (getattr(component, listener.response_name), listener.priority, owner_id, batch_response)
+
+_label_groups = {}                                  # (id of listener table, indices) -> ((label value, indices), ...); tables live as long as their class
+
+def _group_by_label(listener_table:tuple, indices) -> tuple[tuple]:
+    """Return the indices of the listeners in the table, or of those at the indices, grouped by label."""
+    indices = tuple(range(len(listener_table))) if indices == None else tuple(indices)
+    key = (id(listener_table), indices)
+    groups = _label_groups.get(key)
+    if groups == None:
+        indices_by_label = {}
+        for i in indices:
+            indices_by_label.setdefault(listener_table[i].label_value, []).append(i)
+        groups = _label_groups[key] = tuple((label_value, tuple(label_indices)) for label_value, label_indices in indices_by_label.items())
+    return groups
+
+"""Unsubscribes a subscriber when called. An object rather than a closure, so that it is copied along with its game event when forking."""
+class _Unsubscribe:
+    __slots__ = ('_game_event', '_key', '_owner_id')
+
+    def __init__(self, game_event:_GameEvent, key:tuple, owner_id:int):
+        self._game_event = game_event
+        self._key = key
+        self._owner_id = owner_id
+
+    def __call__(self):
+        self._game_event._unsubscribe(self._key, self._owner_id)
+
+"""Subscribers in priority order. Adding and removing are O(1); keys are sorted, and removed keys dropped, lazily when next read,
+so a bulk change (e.g. spawning many entities) sorts once. Invocations share an immutable snapshot which is only rebuilt after the next subscription change."""
+class _SubscriberList:
+    __slots__ = ('_keys', '_sorted', '_subscribers', '_snapshot')
+
+    def __init__(self, pairs:list[tuple] = ()):
+        """Start with each (key, closure) in pairs."""
+        self._keys = [key for key, _ in pairs]  # May be out of order, and may still contain keys which have since been removed
+        self._sorted = len(self._keys) < 2
+        self._subscribers = dict(pairs)
+        self._snapshot = None
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def add(self, key:tuple, closure:callable):
+        if self._sorted and len(self._keys) > 0 and key < self._keys[-1]:
+            self._sorted = False
+        self._keys.append(key)
+        self._subscribers[key] = closure
+        self._snapshot = None
+
+    def extend(self, pairs:list[tuple]):
+        """Add each (key, closure). Keys added together are sorted when next read, along with the rest."""
+        keys = self._keys
+        if self._sorted and (len(pairs) > 1 or (len(keys) > 0 and pairs[0][0] < keys[-1])):
+            self._sorted = False
+        keys.extend(key for key, _ in pairs)
+        self._subscribers.update(pairs)
+        self._snapshot = None
+
+    def remove(self, key:tuple):
+        del self._subscribers[key]
+        self._snapshot = None
+        if len(self._keys) > 2 * len(self._subscribers) + 8:
+            self._compact()
+
+    def snapshot(self) -> tuple[callable]:
+        if self._snapshot == None:
+            self._compact()
+            self._snapshot = tuple(self._subscribers[key] for key in self._keys)
+        return self._snapshot
+
+    def keyed_snapshot(self) -> list[tuple]:
+        self._compact()
+        return [(key, self._subscribers[key]) for key in self._keys]
+
+    def _compact(self):
+        if len(self._keys) != len(self._subscribers):
+            self._keys = [key for key in self._keys if key in self._subscribers]
+        if not self._sorted:
+            self._keys.sort()
+            self._sorted = True
+
+    @staticmethod
+    def merge(*subscriber_lists:'_SubscriberList') -> tuple[callable]:
+        """Return a snapshot of the union of several subscriber lists, in priority order."""
+        nonempty = [subscriber_list for subscriber_list in subscriber_lists if len(subscriber_list) > 0]
+        if len(nonempty) == 1:
+            return nonempty[0].snapshot()
+        return tuple(closure for _, closure in _SubscriberList.merge_keyed(*nonempty))
+
+    @staticmethod
+    def merge_keyed(*subscriber_lists:'_SubscriberList') -> list[tuple]:
+        """Return the (key, closure) pairs of several subscriber lists, in priority order."""
+        return list(heapq.merge(*[s.keyed_snapshot() for s in subscriber_lists], key = lambda pair: pair[0]))
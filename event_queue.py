@@ -0,0 +1,59 @@
+import heapq
+
+from game_event_labels import GameEventLabel
+
+"""Game events waiting to be invoked by an event director in queued mode.
+Events are popped breadth-first: every event enqueued by the listeners of one generation runs after all of that generation. Within a generation, events run
+in order of their label's priority (highest first), then in the order they were enqueued.
+A label may have a coalescing key. Enqueueing an event whose label and key match a waiting event replaces that event's arguments, so only the latest runs.
+Labels which must run immediately, e.g. requests which return their results through their arguments, are never queued. By default these are the labels named 'REQUEST_...'."""
+class EventQueue:
+    def __init__(self):
+        self._heap = []                         # [generation, -priority, sequence, label, args, target_id] for each waiting event
+        self._entries_by_key = {}               # (label, coalescing key) -> waiting entry
+        self._keys_by_label = {}                # Label -> coalescing key function
+        self._priorities = {}
+        self._next_sequence = 0
+        self._generation = 0                    # Generation of the event being invoked
+        self.draining = False
+        self.immediate_labels = {label for label in GameEventLabel if label.name.startswith('REQUEST_')}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def set_priority(self, event_label:GameEventLabel, priority:int):
+        self._priorities[event_label] = priority
+
+    def coalesce(self, event_label:GameEventLabel, key:callable):
+        """Coalesce waiting events of the label for which key(*args, target_id = target_id) is equal. For example, to keep only the latest state change of each entity:
+        queue.coalesce(GameEventLabel.TRY_CHANGE_STATE, lambda id, state, target_id: (id, type(state)))"""
+        self._keys_by_label[event_label] = key
+
+    def push(self, event_label:GameEventLabel, args:tuple, target_id:int or list[int]):
+        key = None
+        if event_label in self._keys_by_label:
+            key = (event_label, self._keys_by_label[event_label](*args, target_id = target_id))
+            if key in self._entries_by_key:
+                entry = self._entries_by_key[key]
+                entry[4] = args
+                entry[5] = target_id
+                return
+        generation = self._generation + 1 if self.draining else 0
+        entry = [generation, -self._priorities.get(event_label, 0), self._next_sequence, event_label, args, target_id, key]
+        self._next_sequence += 1
+        heapq.heappush(self._heap, entry)
+        if key != None:
+            self._entries_by_key[key] = entry
+
+    def pop(self) -> tuple[GameEventLabel, tuple, int or list[int]]:
+        """Remove the next event and return its label, arguments and target."""
+        generation, _, _, event_label, args, target_id, key = heapq.heappop(self._heap)
+        if key != None:
+            del self._entries_by_key[key]
+        self._generation = generation
+        return event_label, args, target_id
+
+    def clear(self):
+        self._heap.clear()
+        self._entries_by_key.clear()
+        self._generation = 0
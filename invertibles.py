@@ -1,59 +1,422 @@
-"""A wrapper for two functions -- do and undo -- which are inverses of each other."""
-class Invertible:
-    def __init__(self, do:callable, undo:callable):
-        if do == None:
-            pass
-        self.do = do
-        self.undo = undo
+from collections import deque
+from copy import deepcopy
+from dataclasses import dataclass
+from sys import getsizeof
+from time import perf_counter_ns
+
+from hearsay.exceptions import InvertibleError
+
+"""The base of every invertible, which does and undoes some change to the game through its do and undo methods.
+affected_ids lists the entities whose state the invertible may change, or is None if it may change any entity's state.
+It holds no do or undo slots, so subclasses which implement do and undo as methods (like SetAttribute) don't pay for them."""
+class BaseInvertible:
+    __slots__ = ('affected_ids',)
 
     @staticmethod
     def compose(*args):
         """Return a new invertible which is a composition of the argument invertibles."""
-        def do_nothing():
-            pass
-        big_invertible = Invertible(do_nothing, do_nothing)
-        for invertible in args:
-            big_invertible = Invertible._compose_two(big_invertible, invertible)
-        return big_invertible
+        return _CompositeInvertible(args)
 
     @property
     def inverse(self):
-        return Invertible(self.undo, self.do)
+        return Invertible(self.undo, self.do, self.affected_ids)
 
-    @staticmethod
-    def _compose_two(l_invertible:'Invertible', r_invertible:'Invertible'):
-        def do_do():
-            l_invertible.do()
-            r_invertible.do()
-        def undo_undo():
-            r_invertible.undo()
-            l_invertible.undo()
-        return Invertible(do_do, undo_undo)
-
-"""An object which tracks the invertibles passed to it, enabling game state changes to be reversed."""
+"""A wrapper for two functions -- do and undo -- which are inverses of each other."""
+class Invertible(BaseInvertible):
+    __slots__ = ('do', 'undo')
+
+    def __init__(self, do:callable, undo:callable, affected_ids:list[int] or tuple[int] = None):
+        self.do = do
+        self.undo = undo
+        self.affected_ids = affected_ids
+
+"""An invertible which sets an attribute of target from old to new, and back. It holds no closures, and the stack applies it without calling do or undo.
+Setting the attribute may run a property setter."""
+class SetAttribute(BaseInvertible):
+    __slots__ = ('target', 'field', 'old', 'new')
+
+    def __init__(self, target, field:str, old, new, affected_ids:list[int] or tuple[int] = None):
+        self.target = target
+        self.field = field
+        self.old = old
+        self.new = new
+        self.affected_ids = affected_ids
+
+    def do(self):
+        setattr(self.target, self.field, self.new)
+
+    def undo(self):
+        setattr(self.target, self.field, self.old)
+
+    @property
+    def inverse(self):
+        return SetAttribute(self.target, self.field, self.new, self.old, self.affected_ids)
+
+"""A flat sequence of invertibles, done in order and undone in reverse order. Nested composites are flattened when composed."""
+class _CompositeInvertible(BaseInvertible):
+    __slots__ = ('_invertibles',)
+
+    def __init__(self, invertibles):
+        flattened = []
+        for invertible in invertibles:
+            if type(invertible) == _CompositeInvertible:
+                flattened += invertible._invertibles
+            else:
+                flattened.append(invertible)
+        self._invertibles = tuple(flattened)
+        affected_ids = set()
+        for invertible in self._invertibles:
+            if invertible.affected_ids == None:
+                affected_ids = None
+                break
+            affected_ids.update(invertible.affected_ids)
+        self.affected_ids = affected_ids
+
+    def __len__(self) -> int:
+        return len(self._invertibles)
+
+    def do(self):
+        for invertible in self._invertibles:
+            if type(invertible) is SetAttribute:
+                setattr(invertible.target, invertible.field, invertible.new)
+            else:
+                invertible.do()
+
+    def undo(self):
+        for invertible in reversed(self._invertibles):
+            if type(invertible) is SetAttribute:
+                setattr(invertible.target, invertible.field, invertible.old)
+            else:
+                invertible.undo()
+
+"""Limits on the history kept by an InvertibleStack. When a limit is exceeded, the oldest undoable entries are dropped.
+max_memory is measured in bytes, as estimated by InvertibleStack.memory_usage."""
+@dataclass
+class HistoryPolicy:
+    max_depth: int = None
+    max_memory: int = None
+
+"""What a call to InvertibleStack.seek did: the entries it moved over, the writes and calls it applied, the writes it collapsed away, and its duration."""
+@dataclass
+class SeekStats:
+    entries: int = 0
+    applied: int = 0
+    collapsed: int = 0
+    seconds: float = 0
+
+"""An object which tracks the invertibles passed to it, enabling game state changes to be reversed.
+Positions count undoable entries from the oldest one kept, so a checkpoint's position is the number of entries that were undoable when it was made."""
 class InvertibleStack:
-    def __init__(self):
-        self._undo_stack = []
+    def __init__(self, policy:HistoryPolicy = None):
+        self.policy = policy if policy != None else HistoryPolicy()
+        self._undo_stack = deque()
         self._redo_stack = []
+        self._undo_sizes = deque()              # Estimated size of each entry, parallel to the stacks
+        self._redo_sizes = []
+        self._memory_usage = 0
+        self._checkpoints = {}
+        self._observers = []
+        self._discard_observers = []
+        self.push_count = 0                     # Entries ever pushed, including those since dropped by the policy
+        self.done_count = 0                     # Invertibles ever pushed, including those collected into transactions
+        self._transaction = []                  # Invertibles done since the outermost open transaction began
+        self._transaction_depth = 0
+        self.last_seek = None
+
+    def __len__(self) -> int:
+        return len(self._undo_stack) + len(self._redo_stack)
+
+    def __deepcopy__(self, memo:dict) -> 'InvertibleStack':
+        """Copy the policy and observers, but not the history, since invertibles' closures can't be copied."""
+        result = InvertibleStack(deepcopy(self.policy, memo))
+        memo[id(self)] = result
+        result._observers = deepcopy(self._observers, memo)
+        result._discard_observers = deepcopy(self._discard_observers, memo)
+        return result
+
+    @property
+    def memory_usage(self) -> int:
+        """A rough estimate, in bytes, of the memory held by the entries on the stack."""
+        return self._memory_usage
+
+    @property
+    def position(self) -> int:
+        return len(self._undo_stack)
+
+    def add_observer(self, observer:callable):
+        """Call observer(invertible) whenever an invertible is pushed, undone or redone."""
+        self._observers.append(observer)
+
+    def remove_observer(self, observer:callable):
+        self._observers.remove(observer)
+
+    def add_discard_observer(self, observer:callable):
+        """Call observer(invertible) for each invertible in an entry which leaves the history without being compacted: an undoable entry dropped by the policy
+        or drop_before, or an undone entry cleared by a push."""
+        self._discard_observers.append(observer)
+
+    def remove_discard_observer(self, observer:callable):
+        self._discard_observers.remove(observer)
 
     def push(self, invertible):
-        self._redo_stack = []
-        self._undo_stack.append(invertible)
-        invertible.do()
+        """Do the invertible and make it an entry. The stack is only changed once do has returned, so an invertible which raises leaves no entry."""
+        self._clear_redo()
+        if type(invertible) is SetAttribute:
+            setattr(invertible.target, invertible.field, invertible.new)
+        else:
+            invertible.do()
+        self.done_count += 1
+        if self._transaction_depth > 0:
+            self._transaction.append(invertible)
+            self._notify(invertible)
+            return
+        self._append_undo(invertible, _estimate_size(invertible))
+        self.push_count += 1
+        self._notify(invertible)
+        self._enforce_policy()
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._transaction_depth > 0
+
+    def begin_transaction(self):
+        """Collect pushes into a single entry until the matching end_transaction, so that one undo reverses them all.
+        Pushed invertibles are still done immediately. Transactions nest, and only the outermost one makes an entry."""
+        self._transaction_depth += 1
+
+    def end_transaction(self):
+        if self._transaction_depth == 0:
+            raise InvertibleError("There is no transaction to end.")
+        self._transaction_depth -= 1
+        if self._transaction_depth > 0 or len(self._transaction) == 0:
+            return
+        invertibles = self._transaction
+        self._transaction = []
+        entry = invertibles[0] if len(invertibles) == 1 else Invertible.compose(*invertibles)
+        self._append_undo(entry, _estimate_size(entry))
+        self.push_count += 1
+        self._enforce_policy()
 
     def try_undo(self) -> bool:
         """Return whether or not there was anything to undo."""
+        if self._transaction_depth > 0:
+            raise InvertibleError("Can't undo during a transaction.")
         if len(self._undo_stack) == 0:
             return False
-        invertible = self._undo_stack.pop()
-        invertible.undo()
-        self._redo_stack.append(invertible)
+        invertible = self._undo_stack[-1]
+        if type(invertible) is SetAttribute:
+            setattr(invertible.target, invertible.field, invertible.old)
+        else:
+            invertible.undo()
+        # Moved only once undone, so that an entry which raises stays where it was
+        self._redo_stack.append(self._undo_stack.pop())
+        self._redo_sizes.append(self._undo_sizes.pop())
+        self._notify(invertible)
         return True
 
     def try_redo(self) -> bool:
         """Return whether or not there was anything to redo."""
+        if self._transaction_depth > 0:
+            raise InvertibleError("Can't redo during a transaction.")
         if len(self._redo_stack) == 0:
             return False
-        invertible = self._redo_stack.pop()
-        invertible.do()
-        return True
\ No newline at end of file
+        invertible = self._redo_stack[-1]
+        if type(invertible) is SetAttribute:
+            setattr(invertible.target, invertible.field, invertible.new)
+        else:
+            invertible.do()
+        self._undo_stack.append(self._redo_stack.pop())
+        self._undo_sizes.append(self._redo_sizes.pop())
+        self._notify(invertible)
+        return True
+
+    def seek(self, position:int or str) -> 'SeekStats':
+        """Undo or redo to the position, or to the named checkpoint, and return how long it took.
+        Consecutive SetAttribute writes (including those inside composites) are collapsed to the net write per target and field, so e.g. many state
+        changes of one component cost a single write. Any other invertible is a barrier: writes are flushed before it is done or undone.
+        Writes to different fields between barriers are assumed to be independent of each other's order."""
+        start = perf_counter_ns()
+        if self._transaction_depth > 0:
+            raise InvertibleError("Can't seek during a transaction.")
+        if type(position) == str:
+            position = self.get_checkpoint(position)
+        if position < 0 or position > len(self):
+            raise InvertibleError(f"Position {position} is outside the stack's history.")
+        stats = SeekStats()
+        count = position - self.position
+        moved = []
+        # Entries are moved only once applied, as in try_undo and try_redo
+        if count < 0:
+            moved = [self._undo_stack[-1 - i] for i in range(-count)]
+            self._apply_net(moved, True, stats)
+            for _ in range(-count):
+                self._redo_stack.append(self._undo_stack.pop())
+                self._redo_sizes.append(self._undo_sizes.pop())
+        elif count > 0:
+            moved = self._redo_stack[:-count - 1:-1]
+            self._apply_net(moved, False, stats)
+            for _ in range(count):
+                self._undo_stack.append(self._redo_stack.pop())
+                self._undo_sizes.append(self._redo_sizes.pop())
+        if len(moved) > 0 and len(self._observers) > 0:
+            self._notify(moved[0] if len(moved) == 1 else Invertible.compose(*moved))
+        stats.entries = abs(count)
+        stats.seconds = (perf_counter_ns() - start) / 1e9
+        self.last_seek = stats
+        return stats
+
+    def _apply_net(self, entries:list, undoing:bool, stats:'SeekStats'):
+        pending = {}                            # (id of target, field) -> [target, field, value] of the net write, in order of first write
+        for entry in entries:
+            parts = entry._invertibles if type(entry) == _CompositeInvertible else (entry,)
+            for part in reversed(parts) if undoing else parts:
+                if type(part) is SetAttribute:
+                    key = (id(part.target), part.field)
+                    write = pending.get(key)
+                    if write == None:
+                        pending[key] = [part.target, part.field, part.old if undoing else part.new]
+                    else:
+                        write[2] = part.old if undoing else part.new
+                        stats.collapsed += 1
+                    continue
+                self._flush_writes(pending, stats)
+                if undoing:
+                    part.undo()
+                else:
+                    part.do()
+                stats.applied += 1
+        self._flush_writes(pending, stats)
+
+    @staticmethod
+    def _flush_writes(pending:dict, stats:'SeekStats'):
+        for target, field, value in pending.values():
+            setattr(target, field, value)
+        stats.applied += len(pending)
+        pending.clear()
+
+    def checkpoint(self, name:str):
+        """Name the current position so that history can later be compacted or dropped up to it."""
+        self._checkpoints[name] = self.position
+
+    def get_checkpoint(self, name:str) -> int:
+        if name not in self._checkpoints:
+            raise InvertibleError(f"No checkpoint named {name} is in the kept history.")
+        return self._checkpoints[name]
+
+    def compact_before(self, name:str):
+        """Collapse every entry before the checkpoint into a single entry, which undoes and redoes them all at once.
+        As in seek, consecutive SetAttribute writes are collapsed to the net write per target and field, and net writes which change nothing are dropped,
+        so compacting frees the memory of superseded writes. Other invertibles are kept as they are, so compacting history made of them only groups it."""
+        position = self._get_undoable_checkpoint(name)
+        if position < 2:
+            return
+        invertibles = _net_invertibles([self._undo_stack.popleft() for _ in range(position)])
+        compacted = invertibles[0] if len(invertibles) == 1 else Invertible.compose(*invertibles)
+        for _ in range(position):
+            self._memory_usage -= self._undo_sizes.popleft()
+        size = _estimate_size(compacted)
+        self._undo_stack.appendleft(compacted)
+        self._undo_sizes.appendleft(size)
+        self._memory_usage += size
+        # Checkpoints inside the compacted entry no longer fall on an entry boundary
+        self._checkpoints = {name: (p - position + 1 if p >= position else 0) for name, p in self._checkpoints.items() if p >= position or p == 0}
+
+    def drop_before(self, name:str):
+        """Discard every entry before the checkpoint. The state they produced is kept, but can no longer be undone."""
+        self._drop_oldest(self._get_undoable_checkpoint(name))
+
+    def _get_undoable_checkpoint(self, name:str) -> int:
+        position = self.get_checkpoint(name)
+        if position > self.position:
+            raise InvertibleError(f"Checkpoint {name} has been undone.")
+        return position
+
+    def _notify(self, invertible):
+        for observer in self._observers:
+            observer(invertible)
+
+    def _notify_discarded(self, entries):
+        for entry in entries:
+            for invertible in entry._invertibles if type(entry) == _CompositeInvertible else (entry,):
+                for observer in self._discard_observers:
+                    observer(invertible)
+
+    def _append_undo(self, invertible, size:int):
+        self._undo_stack.append(invertible)
+        self._undo_sizes.append(size)
+        self._memory_usage += size
+
+    def _clear_redo(self):
+        if len(self._redo_stack) == 0:
+            return
+        if len(self._discard_observers) > 0:
+            self._notify_discarded(self._redo_stack)
+        self._memory_usage -= sum(self._redo_sizes)
+        self._redo_stack = []
+        self._redo_sizes = []
+        self._checkpoints = {name: position for name, position in self._checkpoints.items() if position <= self.position}
+
+    def _drop_oldest(self, count:int):
+        for _ in range(count):
+            entry = self._undo_stack.popleft()
+            self._memory_usage -= self._undo_sizes.popleft()
+            if len(self._discard_observers) > 0:
+                self._notify_discarded((entry,))
+        if count > 0:
+            self._checkpoints = {name: position - count for name, position in self._checkpoints.items() if position >= count}
+
+    def _enforce_policy(self):
+        if self.policy.max_depth != None and len(self._undo_stack) > self.policy.max_depth:
+            self._drop_oldest(len(self._undo_stack) - self.policy.max_depth)
+        if self.policy.max_memory != None:
+            count = 0
+            excess = self._memory_usage - self.policy.max_memory
+            while excess > 0 and count < len(self._undo_stack) - 1:
+                excess -= self._undo_sizes[count]
+                count += 1
+            self._drop_oldest(count)
+
+def _net_invertibles(entries:list) -> list:
+    """Return the invertibles of the entries, in order, with each run of SetAttribute writes replaced by the net write per target and field."""
+    result = []
+    pending = {}                                # (id of target, field) -> net SetAttribute of the current run, in order of first write
+    def flush():
+        result.extend(write for write in pending.values() if write.old != write.new)
+        pending.clear()
+    for entry in entries:
+        for part in entry._invertibles if type(entry) == _CompositeInvertible else (entry,):
+            if type(part) is not SetAttribute:
+                flush()
+                result.append(part)
+                continue
+            key = (id(part.target), part.field)
+            write = pending.get(key)
+            if write == None:
+                pending[key] = SetAttribute(part.target, part.field, part.old, part.new, part.affected_ids)
+            else:
+                write.new = part.new
+                if write.affected_ids != None:
+                    write.affected_ids = None if part.affected_ids == None else tuple(set(write.affected_ids).union(part.affected_ids))
+    flush()
+    if len(result) == 0:
+        result.append(Invertible(_do_nothing, _do_nothing, ()))
+    return result
+
+def _do_nothing():
+    pass
+
+def _estimate_size(invertible) -> int:
+    """Estimate the memory held by an invertible, including the state captured by its closures."""
+    if type(invertible) == _CompositeInvertible:
+        return getsizeof(invertible) + getsizeof(invertible._invertibles) + sum(_estimate_size(i) for i in invertible._invertibles)
+    if type(invertible) is SetAttribute:
+        return getsizeof(invertible)
+    size = getsizeof(invertible)
+    for function in (invertible.do, invertible.undo):
+        size += getsizeof(function)
+        for cell in getattr(function, '__closure__', None) or ():
+            try:
+                size += getsizeof(cell.cell_contents)
+            except ValueError:
+                pass
+    return size
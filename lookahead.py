@@ -0,0 +1,47 @@
+import multiprocessing
+
+from hearsay.invertibles import HistoryPolicy
+
+"""Evaluates candidate lines of play on copies of a game, in parallel across worker processes.
+A candidate is a callable which takes an event director and plays actions on it, or a list of such callables applied in order.
+Candidates, the evaluate function and its results are sent between processes, so they must be picklable (e.g. module level functions and plain data).
+Workers are started with the 'fork' start method, so each inherits its own copy of the game rather than having it pickled. A worker plays each of its candidates
+on that copy and then seeks the stack back, so candidates must change the game only through the stack (i.e. through game events and the director's methods).
+Where fork isn't available, candidates are evaluated serially, each on its own fork of the game."""
+
+_parent_event_director = None                       # Inherited by forked workers
+
+def evaluate_candidates(event_director, candidates:list, evaluate:callable, processes:int = None, chunksize:int = 1) -> list:
+    """Play each candidate on a copy of the game and return evaluate(event_director) after each, in order. The game itself is left unchanged."""
+    global _parent_event_director
+    if 'fork' not in multiprocessing.get_all_start_methods() or processes == 1:
+        return [_evaluate_on_fork(event_director, candidate, evaluate) for candidate in candidates]
+    _parent_event_director = event_director
+    try:
+        with multiprocessing.get_context('fork').Pool(processes, _init_worker) as pool:
+            return pool.map(_evaluate_in_worker, [(candidate, evaluate) for candidate in candidates], chunksize)
+    finally:
+        _parent_event_director = None
+
+def _init_worker():
+    # The worker's copy mustn't append to the parent's command log, and must keep all the history a candidate makes so that it can be rolled back
+    _parent_event_director.stop_recording()
+    _parent_event_director.stack.policy = HistoryPolicy()
+
+def _evaluate_in_worker(candidate_and_evaluate:tuple):
+    candidate, evaluate = candidate_and_evaluate
+    event_director = _parent_event_director
+    position = event_director.stack.position
+    try:
+        return _evaluate(event_director, candidate, evaluate)
+    finally:
+        event_director.stack.seek(position)
+
+def _evaluate_on_fork(event_director, candidate, evaluate:callable):
+    return _evaluate(event_director.fork(), candidate, evaluate)
+
+def _evaluate(event_director, candidate, evaluate:callable):
+    actions = candidate if isinstance(candidate, (list, tuple)) else [candidate]
+    for action in actions:
+        action(event_director)
+    return evaluate(event_director)
@@ -1,18 +1,23 @@
-from multiprocessing.sharedctypes import Value
-from typing import Any, Generic, TypeVar
+from typing import Generic, TypeVar
 from hearsay.exceptions import RequestError
 
+"""Marks an OutVar which hasn't been set. Compared by identity, so that any value, including None, can be a result."""
+UNSET = object()
+
 IT = TypeVar('IT')
 """A generic wrapper to make its nested value mutable, and to indicate an argument which must be set before control is returned."""
 class OutVar(Generic[IT]):
-    def __init__(self, default = None):
+    __slots__ = ('_result',)
+
+    def __init__(self, default = UNSET):
         self._result = default
 
     @property
     def result(self):
-        if self._result == None:
+        result = self._result
+        if result is UNSET:
             raise RequestError("An OutVar argument wasn't set.")
-        return self._result
+        return result
 
     @result.setter
     def result(self, value:IT):
@@ -20,4 +25,31 @@ class OutVar(Generic[IT]):
 
     @property
     def has_been_set(self) -> bool:
-        return self._result != None
+        return self._result is not UNSET
+
+    def get(self, default = None):
+        """Return the result, or default if it hasn't been set."""
+        result = self._result
+        return default if result is UNSET else result
+
+    def reset(self):
+        self._result = UNSET
+
+"""Reusable OutVars for request-style game events, so that a request doesn't allocate a new one.
+Made by EventDirector(use_request_pool = True). Released OutVars are reset, and are reused in any order."""
+class RequestPool:
+    __slots__ = ('_free', 'created')
+
+    def __init__(self):
+        self._free = []
+        self.created = 0
+
+    def acquire(self) -> OutVar:
+        if len(self._free) > 0:
+            return self._free.pop()
+        self.created += 1
+        return OutVar()
+
+    def release(self, out_var:OutVar):
+        out_var._result = UNSET
+        self._free.append(out_var)
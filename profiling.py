@@ -0,0 +1,104 @@
+from dataclasses import dataclass
+from time import perf_counter_ns
+
+from game_event_labels import GameEventLabel
+
+# To profile a game, make the event director with EventDirector(profile = True) (or call enable_profiling on it), then
+# print "event_director.profiler.as_table()" or call "event_director.profiler.write_collapsed_stacks(<path>)" for flamegraph.pl / speedscope.
+
+@dataclass
+class _ProfileStats:
+    count: int = 0
+    cumulative_ns: int = 0
+    self_ns: int = 0
+    subscribers_run: int = 0
+    subscribers_responded: int = 0
+    invertibles: int = 0
+
+"""Records invocation counts, cumulative and self time, fan-out and invertibles produced per game event label and per listener.
+Listeners are named by owner class and response name, as in debug_label."""
+class EventProfiler:
+    def __init__(self):
+        self.label_stats: dict[GameEventLabel, _ProfileStats] = {}
+        self.listener_stats: dict[tuple[GameEventLabel, str], _ProfileStats] = {}
+        self._frames = []                               # [stats, name, start, child time] for each label and listener being timed
+        self._collapsed_ns = {}                         # Collapsed stack -> self time
+        self._names_by_subscriber = {}                  # (class, response name) or qualified name -> name
+
+    def reset(self):
+        self.label_stats.clear()
+        self.listener_stats.clear()
+        self._collapsed_ns.clear()
+
+    def begin_event(self, label:GameEventLabel):
+        if label not in self.label_stats:
+            self.label_stats[label] = _ProfileStats()
+        self._frames.append([self.label_stats[label], label.name, perf_counter_ns(), 0])
+
+    def end_event(self, subscribers_run:int, subscribers_responded:int, invertible_count:int):
+        stats = self._pop_frame()
+        stats.subscribers_run += subscribers_run
+        stats.subscribers_responded += subscribers_responded
+        stats.invertibles += invertible_count
+
+    def begin_listener(self, label:GameEventLabel, subscriber:callable):
+        name = self._get_name(subscriber)
+        key = (label, name)
+        if key not in self.listener_stats:
+            self.listener_stats[key] = _ProfileStats()
+        self._frames.append([self.listener_stats[key], name, perf_counter_ns(), 0])
+
+    def end_listener(self, responded:bool, invertible_count:int):
+        stats = self._pop_frame()
+        stats.subscribers_run += 1
+        stats.subscribers_responded += responded
+        stats.invertibles += invertible_count
+
+    def as_table(self) -> str:
+        result = f"\n{'Label / Listener' : <60}{'Count' : >10}{'Cumulative ms' : >15}{'Self ms' : >12}{'Run' : >10}{'Responded' : >11}{'Invertibles' : >13}\n\n"
+        for label, stats in sorted(self.label_stats.items(), key = lambda item: item[1].cumulative_ns, reverse = True):
+            result += _format_row(label.name, stats)
+            listeners = [(name, s) for (l, name), s in self.listener_stats.items() if l == label]
+            for name, listener_stats in sorted(listeners, key = lambda item: item[1].cumulative_ns, reverse = True):
+                result += _format_row('    ' + name, listener_stats)
+        return result
+
+    def write_collapsed_stacks(self, path:str):
+        """Write self time in microseconds per stack, one 'frame;frame;frame count' line each, as read by flamegraph.pl and speedscope."""
+        with open(path, 'w') as file:
+            for stack, self_ns in self._collapsed_ns.items():
+                file.write(f"{stack} {self_ns // 1000}\n")
+
+    def _pop_frame(self) -> _ProfileStats:
+        stack = ';'.join(frame[1] for frame in self._frames)
+        stats, _, start, child_ns = self._frames.pop()
+        elapsed_ns = perf_counter_ns() - start
+        stats.count += 1
+        stats.cumulative_ns += elapsed_ns
+        stats.self_ns += elapsed_ns - child_ns
+        self._collapsed_ns[stack] = self._collapsed_ns.get(stack, 0) + elapsed_ns - child_ns
+        if len(self._frames) > 0:
+            self._frames[-1][3] += elapsed_ns
+        return stats
+
+    def _get_name(self, subscriber:callable) -> str:
+        # Keyed by class and name rather than by subscriber, so that the profiler doesn't keep components alive
+        if hasattr(subscriber, '__self__'):
+            key = (type(subscriber.__self__), subscriber.__name__)
+        else:
+            key = getattr(subscriber, '__qualname__', None)
+            if key == None:
+                return repr(subscriber)
+        if key not in self._names_by_subscriber:
+            self._names_by_subscriber[key] = key if type(key) == str else _get_listener_name(*key)
+        return self._names_by_subscriber[key]
+
+def _get_listener_name(cls:type, response_name:str) -> str:
+    """Name a component's listener by the class which declared it, as debug_label does."""
+    owner = cls
+    if hasattr(cls, '_get_listener_table'):
+        owner = next((listener.owner for listener in cls._get_listener_table() if listener.response_name == response_name), cls)
+    return f"{owner.__name__}.{response_name}"
+
+def _format_row(name:str, stats:_ProfileStats) -> str:
+    return f"{name : <60}{stats.count : >10}{stats.cumulative_ns / 1e6 : >15.3f}{stats.self_ns / 1e6 : >12.3f}{stats.subscribers_run : >10}{stats.subscribers_responded : >11}{stats.invertibles : >13}\n"
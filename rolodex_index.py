@@ -0,0 +1,72 @@
+from bisect import insort
+from enum import Enum
+
+from hearsay.exceptions import RequestError
+
+"""The rolodex entries of every entity, resolved without game events. Made by EventDirector(use_rolodex_index = True).
+Each attached rolodex component is a layer on its entity. Layers answer in the same order as their REQUEST_ROLODEX_LOOKUP listeners, lowest priority last,
+then latest attached last, and the last layer with an entry wins; so a proxy's entries override those of the rolodexes it is layered on.
+Layers hold their component's rolodex itself, so the index is updated by update_entry whenever a rolodex changes (see RolodexComponent._get_set_entry_invertible).
+The index assumes that rolodex lookups are answered only by rolodex components' entries."""
+class RolodexIndex:
+    def __init__(self):
+        self._layers_by_holder = {}             # Holder id -> [(-priority, sequence), component, rolodex] for each layer, in answering order
+        self._targets = {}                      # (holder id, entry) -> target id of the winning layer
+        self._next_layer = 0
+
+    def add_layer(self, component, holder_id:int, priority:int, rolodex:dict):
+        if holder_id not in self._layers_by_holder:
+            self._layers_by_holder[holder_id] = []
+        insort(self._layers_by_holder[holder_id], ((-priority, self._next_layer), component, rolodex), key = lambda layer: layer[0])
+        self._next_layer += 1
+        self.update_entries(holder_id, rolodex.keys())
+
+    def remove_layer(self, component, holder_id:int):
+        layers = self._layers_by_holder[holder_id]
+        for i, (_, layer_component, rolodex) in enumerate(layers):
+            if layer_component is component:
+                del layers[i]
+                break
+        else:
+            return
+        if len(layers) == 0:
+            del self._layers_by_holder[holder_id]
+        self.update_entries(holder_id, list(rolodex.keys()))
+
+    def update_entry(self, holder_id:int, entry:Enum):
+        """Re-resolve the entry after a layer's rolodex has changed."""
+        for _, _, rolodex in reversed(self._layers_by_holder.get(holder_id, ())):
+            if entry in rolodex:
+                self._targets[(holder_id, entry)] = rolodex[entry]
+                return
+        self._targets.pop((holder_id, entry), None)
+
+    def update_entries(self, holder_id:int, entries):
+        for entry in entries:
+            self.update_entry(holder_id, entry)
+
+    def lookup(self, holder_id:int, entry:Enum) -> int:
+        """Return the id held under the entry. Raise RequestError if the holder has no such entry, as an unanswered lookup would."""
+        try:
+            return self._targets[(holder_id, entry)]
+        except KeyError:
+            raise RequestError(f"Entity {holder_id} has no rolodex entry {entry}.") from None
+
+    def resolve(self, holder_id:int, *path:Enum) -> int:
+        """Follow the entries in turn, starting from the holder, e.g. resolve(id, OWNER, HERO, WEAPON) for "my owner's hero's weapon"."""
+        for entry in path:
+            holder_id = self.lookup(holder_id, entry)
+        return holder_id
+
+    def lookup_many(self, holder_ids:list[int], entry:Enum) -> dict[int, int]:
+        """Return the id held under the entry by each holder which has it."""
+        targets = self._targets
+        return {holder_id: targets[(holder_id, entry)] for holder_id in holder_ids if (holder_id, entry) in targets}
+
+    def resolve_many(self, holder_ids:list[int], *path:Enum) -> dict[int, int]:
+        """Resolve the path from each holder. Holders whose path is broken are left out."""
+        resolved = {holder_id: holder_id for holder_id in holder_ids}
+        for entry in path:
+            targets = self.lookup_many(set(resolved.values()), entry)
+            resolved = {holder_id: targets[id] for holder_id, id in resolved.items() if id in targets}
+        return resolved
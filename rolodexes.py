@@ -2,6 +2,7 @@ from typing import Generic, TypeVar
 from enum import Enum
 
 from hearsay.components import Component, Listener
+from hearsay.invertibles import Invertible
 from hearsay.out_var import OutVar
 
 from game_event_labels import GameEventLabel
@@ -9,26 +10,60 @@ from game_event_labels import GameEventLabel
 class EntityRolodex(Enum):
     pass
 
+_NO_ENTRY = object()                            # Marks a rolodex entry which isn't set
+
 RT = TypeVar('RT', bound = EntityRolodex)
 """A component which allows its entity to keep track of the ids of other entities."""
 class RolodexComponent(Component, Generic[RT]):
+    _lookup_priority = 0                        # The priority of the lookup listener, which orders layers in the event director's rolodex index
+
     def __init__(self, initial_rolodex):
         self._rolodex = initial_rolodex
         super().__init__()
 
-    @Listener(GameEventLabel.REQUEST_ROLODEX_LOOKUP, 0)
+    def attach(self, event_director, id:int):
+        super().attach(event_director, id)
+        if event_director.rolodex_index != None:
+            event_director.rolodex_index.add_layer(self, id, self._lookup_priority, self._rolodex)
+
+    def detach(self):
+        if self._event_director.rolodex_index != None:
+            self._event_director.rolodex_index.remove_layer(self, self._id)
+        super().detach()
+
+    def _get_set_entry_invertible(self, enumerated_name:Enum, id:int) -> Invertible:
+        """Return an invertible which sets the entry to the id, or removes it if id is _NO_ENTRY."""
+        old_id = self._rolodex.get(enumerated_name, _NO_ENTRY)
+        return Invertible(lambda: self._set_entry(enumerated_name, id), lambda: self._set_entry(enumerated_name, old_id), (self._id,))
+
+    def _set_entry(self, enumerated_name:Enum, id:int):
+        if id is _NO_ENTRY:
+            self._rolodex.pop(enumerated_name, None)
+        else:
+            self._rolodex[enumerated_name] = id
+        if self._id != None and self._event_director.rolodex_index != None:
+            self._event_director.rolodex_index.update_entry(self._id, enumerated_name)
+
+    @Listener(GameEventLabel.REQUEST_ROLODEX_LOOKUP, 0, targeted = True)
     def _on_request_rolodex_lookup(self, rolodex_holder_id:int, enumerated_name:Enum, request:OutVar[int]):
-        if not self._includes_attached_id(rolodex_holder_id):
+        if not self._includes_attached_id(rolodex_holder_id) or enumerated_name not in self._rolodex:
             return
         request.result = self._rolodex[enumerated_name]
 
+    @_on_request_rolodex_lookup.batch
+    def _on_request_rolodex_lookup_batch(self, rolodex_holder_ids:list[int], enumerated_name:Enum, requests_by_id:dict[int, OutVar[int]]):
+        if not self._includes_attached_id(rolodex_holder_ids) or enumerated_name not in self._rolodex:
+            return
+        requests_by_id[self._id].result = self._rolodex[enumerated_name]
+
 PT = TypeVar('PT', bound = EntityRolodex)
 """A component which overrides rolodex entries on its entity."""
 class RolodexProxyComponent(Generic[PT], RolodexComponent[PT]):
+    _lookup_priority = -1
+
     def __init__(self, initial_rolodex):
-        self._rolodex = initial_rolodex
-        super().__init__()
+        super().__init__(initial_rolodex)
 
-    @Listener(GameEventLabel.REQUEST_ROLODEX_LOOKUP, -1)
+    @Listener(GameEventLabel.REQUEST_ROLODEX_LOOKUP, -1, targeted = True)
     def _on_request_rolodex_lookup(self, rolodex_holder_id:int, enumerated_name:Enum, request:OutVar[int]):
-        super()._on_request_rolodex_lookup(self, rolodex_holder_id, enumerated_name, request)
+        super()._on_request_rolodex_lookup(rolodex_holder_id, enumerated_name, request)
@@ -0,0 +1,64 @@
+"""Memoized Rule results, keyed by rule and entity id.
+A rule opts in with Rule.memoize. Results are invalidated when an invertible which may affect the entity is pushed, undone or redone, or when a component is attached to or detached from it.
+Results of pure rules depend only on the id, and are never invalidated."""
+class RuleCache:
+    def __init__(self):
+        self._results_by_id = {}                # Entity id -> {rule: result}
+        self._pure_results_by_id = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __deepcopy__(self, memo:dict) -> 'RuleCache':
+        """Copies start empty, since cached rules refer to the original game."""
+        return RuleCache()
+
+    def __len__(self) -> int:
+        return sum(len(results) for results in self._results_by_id.values()) + sum(len(results) for results in self._pure_results_by_id.values())
+
+    def check(self, rule, id:int, check_entity:callable) -> bool:
+        results = self._get_results(rule, id)
+        if rule in results:
+            self.hits += 1
+            return results[rule]
+        self.misses += 1
+        result = check_entity(id)
+        results[rule] = result
+        return result
+
+    def check_many(self, rule, ids:list[int], check_entities:callable) -> dict[int, bool]:
+        passes_by_id = {}
+        missing_ids = []
+        for id in ids:
+            results = self._get_results(rule, id)
+            if rule in results:
+                passes_by_id[id] = results[rule]
+            else:
+                missing_ids.append(id)
+        self.hits += len(passes_by_id)
+        self.misses += len(missing_ids)
+        if len(missing_ids) > 0:
+            for id, result in check_entities(missing_ids).items():
+                self._get_results(rule, id)[rule] = result
+                passes_by_id[id] = result
+        return passes_by_id
+
+    def invalidate(self, ids:list[int] = None):
+        """Forget the results of impure rules for the entities, or for every entity if ids is None."""
+        if ids == None:
+            self._results_by_id.clear()
+            return
+        for id in ids:
+            self._results_by_id.pop(id, None)
+
+    def clear(self):
+        self._results_by_id.clear()
+        self._pure_results_by_id.clear()
+
+    def on_stack_change(self, invertible):
+        self.invalidate(invertible.affected_ids)
+
+    def _get_results(self, rule, id:int) -> dict:
+        results_by_id = self._pure_results_by_id if rule.pure else self._results_by_id
+        if id not in results_by_id:
+            results_by_id[id] = {}
+        return results_by_id[id]
@@ -1,18 +1,25 @@
-from asyncio import events
 import warnings
+from itertools import compress
 
-from abc import ABC
 from game_event_labels import GameEventLabel
 
 from hearsay.event_director import EventDirector
 from hearsay.entity_tag import EntityTag
 from hearsay.class_property import ReadonlyStaticProperty
+from hearsay.rule_cache import RuleCache
 
 """A predicate that takes an entity id as an input.
-Rules are used via REQUEST_PASSES_RULE events as a shortcut to test predicates without retrieving data directly."""
+Rules are used via REQUEST_PASSES_RULE events as a shortcut to test predicates without retrieving data directly.
+A rule may also be given a batch predicate, which takes a list of ids and returns whether each passes, keyed by id,
+and a compiled predicate, which takes a list of ids and returns an array of whether each passes, or None if it can't be evaluated that way (e.g. without a tag index).
+A pure rule's result depends only on the entity id, so memoized results of it are never invalidated."""
 class Rule:
-    def __init__(self, predicate:callable):
+    def __init__(self, predicate:callable, batch_predicate:callable = None, compiled_predicate:callable = None, pure:bool = False):
         self._nested_check_entity = predicate
+        self._nested_check_entities = batch_predicate
+        self._compiled_check_entities = compiled_predicate
+        self.pure = pure
+        self._cache = None
         self.debug_string = None
 
     def __str__(self) -> str:
@@ -22,65 +29,121 @@ class Rule:
 
     # Override this method to check a rule at only the shallowest level of a rule composition.          #TODO: Needs testing
     def check_entity(self, id:int) -> bool:
+        if self._cache != None:
+            return self._cache.check(self, id, self._nested_check_entity)
         return self._nested_check_entity(id)
 
+    def check_entities(self, ids:list[int]) -> dict[int, bool]:
+        """Return whether each entity passes the rule, keyed by id."""
+        if self._cache != None:
+            return self._cache.check_many(self, ids, self._check_nested_entities)
+        passes = self._try_compiled_check(ids)
+        if passes is not None:
+            return dict(zip(ids, passes.tolist()))
+        if self._nested_check_entities == None:
+            return {id: self.check_entity(id) for id in ids}
+        return self._nested_check_entities(ids)
+
+    def filter_entities(self, ids:list[int]) -> list[int]:
+        """Return the ids which pass the rule, in order."""
+        passes = self._try_compiled_check(ids) if self._cache == None else None
+        if passes is not None:
+            return list(compress(ids, passes.tolist()))
+        passes_by_id = self.check_entities(ids)
+        return [id for id in ids if passes_by_id[id]]
+
+    def memoize(self, cache:RuleCache) -> 'Rule':
+        """Cache this rule's results in the cache (usually EventDirector.rule_cache). Return the rule."""
+        self._cache = cache
+        return self
+
+    def _try_compiled_check(self, ids:list[int]):
+        if self._compiled_check_entities == None:
+            return None
+        return self._compiled_check_entities(ids)
+
+    def _check_nested_entities(self, ids:list[int]) -> dict[int, bool]:
+        passes = self._try_compiled_check(ids)
+        if passes is not None:
+            return dict(zip(ids, passes.tolist()))
+        if self._nested_check_entities == None:
+            return {id: self._nested_check_entity(id) for id in ids}
+        return self._nested_check_entities(ids)
+
     @ReadonlyStaticProperty
     def contradiction():
-        return Rule(lambda _: False)
+        return Rule(lambda _: False, lambda ids: {id: False for id in ids}, pure = True)
 
     @ReadonlyStaticProperty
     def tautalogy():
-        return Rule(lambda _: True)
+        return Rule(lambda _: True, lambda ids: {id: True for id in ids}, pure = True)
 
     @staticmethod
     def has_tags(event_director:EventDirector, tag_type:type, *desired_tags:EntityTag):         #TODO: is it necessary to pass tag_type here?
-        def predicate(event_director:EventDirector, id:int):
-            tags = {}
-            event_director.invoke_game_event(GameEventLabel.REQUEST_TAGS, id, tags)
+        def test(id:int, tags:dict):
             try:
                 for tag in desired_tags:
                     if tag not in tags[tag_type]:
                         return False
             except KeyError:
-                warnings.warn('Entity with id {id} did not respond to {GameEventLabel.REQUEST_TAGS}')
+                warnings.warn(f'Entity with id {id} did not respond to {GameEventLabel.REQUEST_TAGS}')
                 return False
             return True
-        rule = Rule(lambda id: predicate(event_director, id))
+        rule = Rule._from_tags_test(event_director, test, tag_type, desired_tags, 'has_tags')
         rule.debug_string = f"Has tags: {desired_tags}"
         return rule
 
     @staticmethod
     def has_any_of_tags(event_director:EventDirector, tag_type:type, *desired_tags:EntityTag):
-        def predicate(event_director:EventDirector, id:int):
-            tags = {}
-            event_director.invoke_game_event(GameEventLabel.REQUEST_TAGS, id, tags)
+        def test(id:int, tags:dict):
             try:
                 for tag in desired_tags:
                     if tag in tags[tag_type]:
                         return True
             except KeyError:
-                warnings.warn('Entity with id {id} did not respond to {GameEventLabel.REQUEST_TAGS}')
+                warnings.warn(f'Entity with id {id} did not respond to {GameEventLabel.REQUEST_TAGS}')
             return False
-        rule = Rule(lambda id: predicate(event_director, id))
+        rule = Rule._from_tags_test(event_director, test, tag_type, desired_tags, 'has_any_of_tags')
         rule.debug_string = f"Has any of tags: {desired_tags}"
         return rule
 
     @staticmethod
     def lacks_tags(event_director:EventDirector, tag_type:type, *undesired_tags:EntityTag):
-        def predicate(event_director:EventDirector, id:int):
-            tags = {}
-            event_director.invoke_game_event(GameEventLabel.REQUEST_TAGS, id, tags)
+        def test(id:int, tags:dict):
             try:
                 for tag in undesired_tags:
                     if tag in tags[tag_type]:
                         return False
             except KeyError:
-                warnings.warn('Entity with id {id} did not respond to {GameEventLabel.REQUEST_TAGS}')
+                warnings.warn(f'Entity with id {id} did not respond to {GameEventLabel.REQUEST_TAGS}')
             return True
-        rule = Rule(lambda id: predicate(event_director, id))
+        rule = Rule._from_tags_test(event_director, test, tag_type, undesired_tags, 'lacks_tags')
         rule.debug_string = f"Doesn't have tags: {undesired_tags}"
         return rule
 
+    @staticmethod
+    def _from_tags_test(event_director:EventDirector, test:callable, tag_type:type, tags:tuple[EntityTag], index_test_name:str) -> 'Rule':
+        """Make a rule which requests an entity's tags and passes them to test(id, tags). Batches request every entity's tags in one event.
+        If the event director has a tag index, batches are instead compiled to the index's mask test called index_test_name."""
+        tag_values = [tag.value for tag in tags]
+        def compiled_predicate(ids:list[int]):
+            if event_director.tag_index == None:
+                return None
+            return getattr(event_director.tag_index, index_test_name)(ids, tag_type, tag_values)
+        spare_tags = []                                     # Cleared dicts reused between checks; a list rather than one dict, since checks may nest
+        def predicate(id:int):
+            tags = spare_tags.pop() if len(spare_tags) > 0 else {}
+            try:
+                event_director.invoke_game_event(GameEventLabel.REQUEST_TAGS, id, tags, target_id = id)
+                return test(id, tags)
+            finally:
+                tags.clear()
+                spare_tags.append(tags)
+        def batch_predicate(ids:list[int]):
+            tags_by_id = event_director.invoke_game_event_batch(GameEventLabel.REQUEST_TAGS, ids, result_factory = dict)
+            return {id: test(id, tags) for id, tags in tags_by_id.items()}
+        return Rule(predicate, batch_predicate, compiled_predicate)
+
     @staticmethod
     def compose(*subrules:'Rule'):
         def predicate(id):
@@ -88,10 +151,30 @@ class Rule:
                 if rule._nested_check_entity(id) is False:
                     return False
             return True
+        def batch_predicate(ids):
+            passes_by_id = {id: True for id in ids}
+            remaining = list(passes_by_id.keys())
+            for rule in subrules:
+                if len(remaining) == 0:
+                    break
+                rule_passes_by_id = rule._check_nested_entities(remaining)
+                for id in remaining:
+                    if rule_passes_by_id[id] is False:
+                        passes_by_id[id] = False
+                remaining = [id for id in remaining if passes_by_id[id]]
+            return passes_by_id
+        def compiled_predicate(ids):
+            result = None
+            for rule in subrules:
+                passes = rule._try_compiled_check(ids)
+                if passes is None:
+                    return None
+                result = passes if result is None else result & passes
+            return result
         debug_string = 'Passes rules:\n'
         for rule in subrules:
             debug_string += '     ' + str(rule) + '\n'
-        rule = Rule(predicate)
+        rule = Rule(predicate, batch_predicate, compiled_predicate)
         rule.debug_string = debug_string
         return rule
 
@@ -99,4 +182,9 @@ class Rule:
     def negate(rule:'Rule'):
         def predicate(id):
             return rule.check_entity(id) is False
-        return Rule(predicate)
+        def batch_predicate(ids):
+            return {id: passes is False for id, passes in rule.check_entities(ids).items()}
+        def compiled_predicate(ids):
+            passes = rule._try_compiled_check(ids)
+            return None if passes is None else ~passes
+        return Rule(predicate, batch_predicate, compiled_predicate)
@@ -0,0 +1,73 @@
+import numpy as np
+
+from hearsay.dense_arrays import grown_capacity, resized
+from component_states import ComponentState
+
+_ABSENT = -2                                    # No component of the class is attached to the entity
+_NO_STATE = -1                                  # A component is attached, but its state is None
+
+"""Component states stored in one contiguous integer column per (component class, state type), indexed by entity id.
+Used by GenericComponent when the event director is made with use_state_store = True, so that whole-board questions about component state are array operations.
+Each entity may have only one component of a given class and state type attached."""
+class ComponentStateStore:
+    def __init__(self, initial_capacity:int = 64):
+        self._capacity = max(initial_capacity, 1)
+        self._columns = {}                      # (component class, state type) -> array of state values by entity id
+        self._states_by_value = {}              # State type -> {value: state}, so that reads don't construct flags
+
+    def get(self, component_class:type, state_type:type, id:int) -> ComponentState:
+        column = self._columns.get((component_class, state_type))
+        if column is None or id >= len(column):
+            return None
+        value = column.item(id)
+        if value < 0:
+            return None
+        states = self._states_by_value.get(state_type)
+        if states == None:
+            states = self._states_by_value[state_type] = {}
+        state = states.get(value)
+        if state == None:
+            state = states[value] = state_type(value)
+        return state
+
+    def set(self, component_class:type, state_type:type, id:int, state:ComponentState):
+        self._get_column(component_class, state_type, id)[id] = _NO_STATE if state == None else state.value
+
+    def remove(self, component_class:type, state_type:type, id:int):
+        self._get_column(component_class, state_type, id)[id] = _ABSENT
+
+    def get_column(self, component_class:type, state_type:type):
+        """Return a read-only view of the raw state values by entity id. Negative values mark entities without the component or without a state."""
+        column = self._columns.get((component_class, state_type))
+        if column is None:
+            return np.full(0, _ABSENT, dtype = np.int64)
+        view = column.view()
+        view.flags.writeable = False
+        return view
+
+    def ids_in_state(self, component_class:type, state_type:type, state:ComponentState):
+        """Return an array of the ids of the entities whose component is in exactly the state."""
+        return np.flatnonzero(self.get_column(component_class, state_type) == (_NO_STATE if state == None else state.value))
+
+    def ids_matching(self, component_class:type, state_type:type, inclusive_restrictions:ComponentState = None, exclusive_restrictions:ComponentState = None):
+        """Return an array of the ids of the entities whose component's state matches the restrictions, with the same meaning as a Listener's."""
+        column = self.get_column(component_class, state_type)
+        has_state = column >= 0
+        matches = has_state.copy()
+        if inclusive_restrictions != None:
+            matches &= (column & inclusive_restrictions.value) == inclusive_restrictions.value
+        if exclusive_restrictions != None:
+            matches &= (column & exclusive_restrictions.value) == 0
+        if not inclusive_restrictions:
+            matches |= column == _NO_STATE
+        return np.flatnonzero(matches)
+
+    def _get_column(self, component_class:type, state_type:type, id:int):
+        key = (component_class, state_type)
+        if id >= self._capacity:
+            self._capacity = grown_capacity(self._capacity, id + 1)
+            for other_key, column in self._columns.items():
+                self._columns[other_key] = resized(column, self._capacity, _ABSENT)
+        if key not in self._columns:
+            self._columns[key] = np.full(self._capacity, _ABSENT, dtype = np.int64)
+        return self._columns[key]
@@ -10,13 +10,29 @@ class TagComponent(Component):
         self._tag = tag
         super().__init__()
 
-    @Listener(GameEventLabel.REQUEST_TAGS)
+    def attach(self, event_director, id:int):
+        super().attach(event_director, id)
+        if event_director.tag_index != None:
+            event_director.tag_index.add_tag(self, id, self._tag_type, self._tag)
+
+    def detach(self):
+        if self._event_director.tag_index != None:
+            self._event_director.tag_index.remove_tag(self, self._id, self._tag_type)
+        super().detach()
+
+    @Listener(GameEventLabel.REQUEST_TAGS, targeted = True)
     def _on_request_tags(self, candidate_id:int, tags_by_type:dict[type, EntityTag]):
         if not self._includes_attached_id(candidate_id):
             return
         tags_by_type[self._tag_type] = self._tag
 
-    @Listener(GameEventLabel.REQUEST_PASSES_RULE)
+    @_on_request_tags.batch
+    def _on_request_tags_batch(self, candidate_ids:list[int], tags_by_type_by_id:dict[int, dict[type, EntityTag]]):
+        if not self._includes_attached_id(candidate_ids):
+            return
+        tags_by_type_by_id[self._id][self._tag_type] = self._tag
+
+    @Listener(GameEventLabel.REQUEST_PASSES_RULE, targeted = True)
     def _on_request_passes_rule(self, candidate_id:list[int], rule:Rule, passes_rule:dict[int, bool]):
         if not self._includes_attached_id(candidate_id):
             return
@@ -0,0 +1,90 @@
+import numpy as np
+
+from hearsay.dense_arrays import grown_capacity, resized
+from hearsay.entity_tag import EntityTag
+
+"""An index of the tags of every attached TagComponent, stored as an integer bitmask per entity and tag type.
+Kept up to date by TagComponent when the event director is made with use_tag_index = True, so that tag rules can test whole sets of entities at once.
+Masks are indexed directly by entity id; entities without a tag of a type have an empty mask for it."""
+class TagIndex:
+    def __init__(self, initial_capacity:int = 64):
+        self._capacity = max(initial_capacity, 1)
+        self._masks_by_type = {}                # Tag type -> array of masks by entity id
+        self._layers = {}                       # (id, tag type) -> [(component, tag)], the last of which is the one requests see
+        self._tag_type_counts_by_id = {}
+
+    def __len__(self) -> int:
+        return len(self._tag_type_counts_by_id)
+
+    def add_tag(self, component, id:int, tag_type:type, tag:EntityTag):
+        layers = self._layers.setdefault((id, tag_type), [])
+        if len(layers) == 0:
+            self._tag_type_counts_by_id[id] = self._tag_type_counts_by_id.get(id, 0) + 1
+        layers.append((component, tag))
+        self._write(id, tag_type, tag.value)
+
+    def remove_tag(self, component, id:int, tag_type:type):
+        layers = self._layers[(id, tag_type)]
+        layers[:] = [layer for layer in layers if layer[0] is not component]
+        if len(layers) > 0:
+            self._write(id, tag_type, layers[-1][1].value)
+            return
+        del self._layers[(id, tag_type)]
+        self._write(id, tag_type, 0)
+        self._tag_type_counts_by_id[id] -= 1
+        if self._tag_type_counts_by_id[id] == 0:
+            del self._tag_type_counts_by_id[id]
+
+    def get_masks(self, ids:list[int], tag_type:type):
+        """Return an array of the tag masks of the entities."""
+        ids = np.asarray(ids, dtype = np.intp)
+        if tag_type not in self._masks_by_type:
+            return np.zeros(len(ids), dtype = np.int64)
+        masks = self._masks_by_type[tag_type]
+        if len(ids) == 0 or ids.max() < len(masks):
+            return masks[ids]
+        result = np.zeros(len(ids), dtype = masks.dtype)
+        in_range = ids < len(masks)
+        result[in_range] = masks[ids[in_range]]
+        return result
+
+    # Each of these takes the values of the tags being tested. As in a REQUEST_TAGS test, an entity has a tag if its mask has all of the tag's bits.
+
+    def has_tags(self, ids:list[int], tag_type:type, tag_values:list[int]):
+        mask = 0
+        for value in tag_values:
+            mask |= value
+        return (self.get_masks(ids, tag_type) & mask) == mask
+
+    def has_any_of_tags(self, ids:list[int], tag_type:type, tag_values:list[int]):
+        masks = self.get_masks(ids, tag_type)
+        single_bits = 0                         # Single-bit tags are tested together
+        result = np.zeros(len(masks), dtype = bool)
+        for value in tag_values:
+            if value != 0 and value & (value - 1) == 0:
+                single_bits |= value
+            else:
+                result |= (masks & value) == value
+        if single_bits != 0:
+            result |= (masks & single_bits) != 0
+        return result
+
+    def lacks_tags(self, ids:list[int], tag_type:type, tag_values:list[int]):
+        return ~self.has_any_of_tags(ids, tag_type, tag_values)
+
+    def _write(self, id:int, tag_type:type, mask:int):
+        if id >= self._capacity:
+            self._grow(id + 1)
+        if tag_type not in self._masks_by_type:
+            self._masks_by_type[tag_type] = np.zeros(self._capacity, dtype = _get_mask_dtype(tag_type))
+        self._masks_by_type[tag_type][id] = mask
+
+    def _grow(self, minimum_capacity:int):
+        self._capacity = grown_capacity(self._capacity, minimum_capacity)
+        for tag_type in self._masks_by_type.keys():
+            self._masks_by_type[tag_type] = resized(self._masks_by_type[tag_type], self._capacity)
+
+def _get_mask_dtype(tag_type:type):
+    """Flags which don't fit in 63 bits fall back to arrays of Python ints."""
+    largest = max([member.value for member in tag_type.__members__.values()], default = 0)
+    return np.int64 if largest < 2 ** 63 else object